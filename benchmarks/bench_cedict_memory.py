@@ -0,0 +1,65 @@
+"""
+Memory used by open_cedict with and without compact=True.
+
+Usage: python bench_cedict_memory.py [path/to/cedict_ts.u8]
+Without a path, a synthetic cedict file is used.
+"""
+import io
+import os
+import random
+import sys
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+ENTRIES = 120000
+DEFINITIONS = ['to measure', 'horse', 'surname %s', 'variant of %s',
+               'see %s', 'old variant of %s', 'temporary', 'capacity']
+
+
+def synthetic_cedict(size, seed=0):
+    """ A cedict file with repeating pinyin and definitions. """
+
+    rand = random.Random(seed)
+    syllables = pyjiong.PINYIN_SYLLABLES[:200]
+    lines = []
+    for number in range(size):
+        length = rand.choice((1, 2, 2, 2, 3, 4))
+        simp = ''.join(chr(0x4E00 + rand.randrange(3000))
+                       for _ in range(length))
+        trad = simp if rand.random() < 0.6 else simp[::-1]
+        pinyin = ' '.join(rand.choice(syllables) + str(rand.randint(1, 5))
+                          for _ in range(length))
+        definitions = '/'.join(rand.choice(DEFINITIONS).replace('%s', simp)
+                               for _ in range(rand.randint(1, 3)))
+        extra = '/CL:個|个[ge4]' if rand.random() < 0.1 else ''
+        lines.append('%s %s [%s] /%s%s/' % (trad, simp, pinyin, definitions,
+                                           extra))
+    return '\n'.join(lines)
+
+
+def measure(text, compact):
+    tracemalloc.start()
+    shared = {} if compact else False
+    trad = pyjiong.open_cedict(io.StringIO(text), 'trad', compact=shared)
+    simp = pyjiong.open_cedict(io.StringIO(text), 'simp', compact=shared)
+    del shared
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    entries = sum(len(e) for e in trad.values())
+    return size, entries
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], mode='r', encoding='utf-8') as cedict_file:
+            text = cedict_file.read()
+    else:
+        text = synthetic_cedict(ENTRIES)
+    default, entries = measure(text, False)
+    compact, _ = measure(text, True)
+    print('%d entries, trad and simp version' % entries)
+    print('default: %6.1f MB, %4d bytes/entry' % (default / 1e6,
+                                                  default / entries))
+    print('compact: %6.1f MB, %4d bytes/entry (%.0f%% less)' % (
+        compact / 1e6, compact / entries, 100 - 100.0 * compact / default))
@@ -0,0 +1,96 @@
+"""
+Memory used by the words of a large ChList.
+
+Compares ChWord (slots) with a word class storing its attributes in a
+dictionary like ChWord used to. The strings are the same for both, so the
+difference is the memory used by the word objects themselves. Since
+python 3.11, the dictionaries of objects with the same attributes share
+their keys, so the difference is much bigger with older versions, but
+reading __dict__ (as saving used to) creates a real dictionary for each
+word, which is what "after save" shows.
+
+Usage: python bench_chlist_memory.py [path/to/list.txt]
+Without a path, a synthetic list is used (see bench_text_list.py).
+"""
+import os
+import sys
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+from bench_text_list import synthetic_list
+
+ENTRIES = 300000
+
+
+class DictWord(object):
+    """ The old ChWord, all attributes in the instance dictionary. """
+
+    def __init__(self, attributes={}):
+        for name, value in attributes.items():
+            setattr(self, name, value)
+        for name in ['simp', 'trad', 'pinyin', 'definition']:
+            if not hasattr(self, name):
+                setattr(self, name, '')
+        for name in ['section', 'number']:
+            if not hasattr(self, name):
+                setattr(self, name, -1)
+
+
+def measure(word_class, attr_dicts):
+    tracemalloc.start()
+    words = [word_class(attr_dic) for attr_dic in attr_dicts]
+    size = tracemalloc.get_traced_memory()[0]
+    # saving must not leave anything behind in the words
+    with open(os.devnull, mode='w', encoding='utf-8') as out_file:
+        if word_class is DictWord:  # like ChList.save_file used to
+            pyjiong.save_text_list(out_file, [], (word.__dict__
+                                                  for word in words))
+        else:
+            pyjiong.ChList('list', words=words).save_file(out_file)
+    after_save = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, after_save, len(words)
+
+
+def measure_open(path, old):
+    """ Memory of a whole ChList (words and strings) opened from path. """
+
+    tracemalloc.start()
+    with open(path, mode='r', encoding='utf-8') as list_file:
+        if old:  # like ChList.open_file used to
+            sections, attr_dicts = pyjiong.open_text_list(list_file)
+            words = [DictWord(attr_dic) for attr_dic in attr_dicts]
+        else:
+            words = pyjiong.ChList('list', list_file).words
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'bench_chlist_memory.txt')
+        synthetic_list(path, ENTRIES)
+    try:
+        with open(path, mode='r', encoding='utf-8') as list_file:
+            sections, attr_dicts = pyjiong.open_text_list(list_file)
+        old_open = measure_open(path, True)
+        new_open = measure_open(path, False)
+    finally:
+        if len(sys.argv) < 2:
+            os.remove(path)
+    old, old_saved, entries = measure(DictWord, attr_dicts)
+    new, new_saved, _ = measure(pyjiong.ChWord, attr_dicts)
+    print('%d words, word objects only' % entries)
+    print('dict:  %6.1f MB, %4d bytes/word, %6.1f MB after save' % (
+        old / 1e6, old / entries, old_saved / 1e6))
+    print('slots: %6.1f MB, %4d bytes/word, %6.1f MB after save '
+          '(%.0f%% less)' % (new / 1e6, new / entries, new_saved / 1e6,
+                             100 - 100.0 * new / old))
+    print('whole list with strings, opened from a file')
+    for name, (size, peak) in (('old', old_open), ('new', new_open)):
+        print('%s:   %6.1f MB, peak while opening %6.1f MB' % (
+            name, size / 1e6, peak / 1e6))
@@ -0,0 +1,48 @@
+"""
+ChList.combine for many lists compared to chaining mix_with.
+
+LISTS synthetic lists of WORDS words each, the words of the first list
+which are in all other lists (intersection) or in none of them
+(difference).
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+from bench_mix_with import synthetic_chlist
+
+LISTS = 10
+WORDS = 20000
+
+
+def chained(lists, result_no):
+    result = lists[0]
+    for chlist in lists[1:]:
+        result = result.mix_with(chlist, 'simp')[result_no]
+    return result
+
+
+if __name__ == '__main__':
+    # a small vocabulary, so the lists share many words
+    lists = [synthetic_chlist('list%d' % no, WORDS, no) for no in range(LISTS)]
+    vocabulary = [word.simp for word in lists[0].words[:WORDS // 4]]
+    for chlist in lists[1:]:
+        for no, word in enumerate(chlist.words):
+            if no % 4:
+                word.simp = vocabulary[(no * 7919) % len(vocabulary)]
+    for operation, result_no in (('intersection', 1), ('difference', 0)):
+        start = time.perf_counter()
+        expected = chained(lists, result_no)
+        chain_time = time.perf_counter() - start
+        for views in (False, True):
+            start = time.perf_counter()
+            result = pyjiong.ChList.combine(lists, 'simp',
+                                            operation=operation, views=views)
+            elapsed = time.perf_counter() - start
+            same = [w.simp for w, _ in result.rows()] if views else\
+                [w.simp for w in result.words]
+            print('%s, %d lists: mix_with chain %.2fs, combine (views=%s) '
+                  '%.2fs, same words: %s' % (
+                      operation, LISTS, chain_time, views, elapsed,
+                      same == [w.simp for w in expected.words]))
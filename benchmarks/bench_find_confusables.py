@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+WORDS = 50000
+SAMPLE = 2000
+
+
+def synthetic_list(size, seed=0):
+    """ A list of words with 1-4 random syllables. """
+
+    rand = random.Random(seed)
+    syllables = pyjiong.PINYIN_SYLLABLES
+    words = []
+    for number in range(size):
+        pinyin = ' '.join(rand.choice(syllables) + str(rand.randint(1, 5))
+                          for _ in range(rand.choice((1, 2, 2, 2, 3, 4))))
+        words.append(pyjiong.ChWord({'pinyin': pinyin, 'number': number}))
+    return pyjiong.ChList('synthetic', words=words)
+
+
+def all_pairs(chlist):
+    """ The naive way: pinyin_are_similar for every pair of words. """
+
+    syllables = [word.pinyin.split() for word in chlist.words]
+    for no1, pinyin1 in enumerate(syllables):
+        for no2 in range(no1 + 1, len(syllables)):
+            pinyin2 = syllables[no2]
+            if len(pinyin1) == len(pinyin2) and all(
+                    pyjiong.pinyin_are_similar(p1, p2)
+                    for p1, p2 in zip(pinyin1, pinyin2)):
+                yield (no1, no2)
+
+
+if __name__ == '__main__':
+    sample = synthetic_list(SAMPLE)
+    assert sorted(sample.find_confusables()) == list(all_pairs(sample))
+
+    start = time.perf_counter()
+    naive_pairs = sum(1 for _ in all_pairs(sample))
+    naive = time.perf_counter() - start
+    estimate = naive * (WORDS / SAMPLE) ** 2
+
+    chlist = synthetic_list(WORDS)
+    start = time.perf_counter()
+    pairs = sum(1 for _ in chlist.find_confusables())
+    bucketed = time.perf_counter() - start
+
+    print('all pairs, %d words:      %.2fs (%d pairs)' % (SAMPLE, naive,
+                                                         naive_pairs))
+    print('all pairs, %d words:     ~%.0fs (extrapolated)' % (WORDS,
+                                                              estimate))
+    print('find_confusables, %d words: %.2fs (%d pairs, %.0fx)' % (
+        WORDS, bucketed, pairs, estimate / bucketed))
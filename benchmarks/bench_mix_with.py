@@ -0,0 +1,53 @@
+"""
+Time and memory of ChList.mix_with with copied words and with views.
+
+Two synthetic lists of WORDS words each are compared by whole words and by
+characters.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+WORDS = 100000
+SECTION_SIZE = 50
+
+
+def synthetic_chlist(name, size, seed):
+    rand = random.Random(seed)
+    sections = [['Lesson %d' % no] for no in range(size // SECTION_SIZE)]
+    words = []
+    for number in range(size):
+        simp = ''.join(chr(0x4E00 + rand.randrange(3000))
+                       for _ in range(rand.choice((1, 2, 2, 3))))
+        words.append(pyjiong.ChWord({'simp': simp, 'pinyin': 'pin1yin1',
+                                     'definition': 'definition',
+                                     'section': number // SECTION_SIZE,
+                                     'number': number}))
+    return pyjiong.ChList(name, sections=sections, words=words)
+
+
+if __name__ == '__main__':
+    list1 = synthetic_chlist('list1', WORDS, 1)
+    list2 = synthetic_chlist('list2', WORDS, 2)
+    for iterate in (False, True):
+        # create the indexes first, so only the mixing is measured
+        list1.mix_with(list2, 'simp', iterate, views=True)
+        for views in (False, True):
+            start = time.perf_counter()
+            results = list1.mix_with(list2, 'simp', iterate, views=views)
+            elapsed = time.perf_counter() - start
+            del results
+            tracemalloc.start()
+            results = list1.mix_with(list2, 'simp', iterate, views=views)
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print('iterate=%s, views=%s: %.2fs, %5.1f MB (%s words)' % (
+                iterate, views, elapsed, size / 1e6,
+                ' / '.join(str(len(result)) if views
+                           else str(len(result.words))
+                           for result in results)))
+            del results
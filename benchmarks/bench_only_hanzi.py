@@ -0,0 +1,44 @@
+import os
+import re
+import sys
+import timeit
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+
+def legacy_only_hanzi(word):
+    """ The old implementation, rebuilding the pattern for every call. """
+
+    if word.strip() == '':
+        return ''
+    LHan = [[0x2E80, 0x2E99], [0x2E9B, 0x2EF3], [0x2F00, 0x2FD5], 0x3005,
+            0x3007, [0x3021, 0x3029], [0x3038, 0x303A], 0x303B,
+            [0x3400, 0x4DB5], [0x4E00, 0x9FC3], [0xF900, 0xFA2D],
+            [0xFA30, 0xFA6A], [0xFA70, 0xFAD9], [0x20000, 0x2A6D6],
+            [0x2F800, 0x2FA1D]]
+    pattern_list = []
+    for char_range in LHan:
+        if isinstance(char_range, list):
+            pattern_list.append('%s-%s' % (chr(char_range[0]),
+                                           chr(char_range[1])))
+        else:
+            pattern_list.append(chr(char_range))
+    pattern = re.compile('[%s]' % ''.join(pattern_list))
+    return ''.join([c for c in word if pattern.match(c)])
+
+
+LINE = '第1课：你好！Nǐ hǎo! 我们是中国人, we are Chinese. 謝謝。'
+LINES = [LINE] * 20000
+
+if __name__ == '__main__':
+    assert all(legacy_only_hanzi(l) == pyjiong.only_hanzi(l) for l in LINES)
+    legacy = min(timeit.repeat(
+        lambda: [legacy_only_hanzi(l) for l in LINES], number=1, repeat=3))
+    single = min(timeit.repeat(
+        lambda: [pyjiong.only_hanzi(l) for l in LINES], number=1, repeat=3))
+    many = min(timeit.repeat(
+        lambda: list(pyjiong.only_hanzi_many(LINES)), number=1, repeat=3))
+    print('%d lines' % len(LINES))
+    print('legacy only_hanzi: %.3fs' % legacy)
+    print('only_hanzi:        %.3fs (%.1fx)' % (single, legacy / single))
+    print('only_hanzi_many:   %.3fs (%.1fx)' % (many, legacy / many))
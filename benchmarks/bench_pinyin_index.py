@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+ENTRIES = 120000
+QUERIES = ['zhong1 guo2', 'ma3', 'xue2 sheng5', 'dian4 nao3']
+
+
+def synthetic_cedict(size, seed=0):
+    """ A dict like the output of open_cedict with random pinyin. """
+
+    rand = random.Random(seed)
+    syllables = pyjiong.PINYIN_SYLLABLES
+    cedict = {}
+    for number in range(size):
+        pinyin = ' '.join(rand.choice(syllables) + str(rand.randint(1, 5))
+                          for _ in range(rand.choice((1, 2, 2, 2, 3, 4))))
+        cedict.setdefault('w%d' % (number // 2), []).append(
+            ('', pinyin, ('definition',), {}))
+    for query in QUERIES:
+        cedict[query] = [('', query, ('definition',), {})]
+    return cedict
+
+
+def scan_similar(cedict, pinyin):
+    """ The naive way: pinyin_are_similar for every entry. """
+
+    query = pinyin.split()
+    result = []
+    for key, entries in cedict.items():
+        for entry in entries:
+            syllables = entry[1].split()
+            if len(syllables) == len(query) and all(
+                    pyjiong.pinyin_are_similar(p1, p2)
+                    for p1, p2 in zip(query, syllables)):
+                result.append((key, entry))
+    return result
+
+
+if __name__ == '__main__':
+    cedict = synthetic_cedict(ENTRIES)
+    start = time.perf_counter()
+    index = pyjiong.PinyinIndex(cedict)
+    build = time.perf_counter() - start
+    print('numpy: %s' % ('yes' if pyjiong.pinyinindex.numpy else 'no'))
+    print('build index, %d entries: %.2fs' % (ENTRIES, build))
+    for query in QUERIES:
+        start = time.perf_counter()
+        scanned = scan_similar(cedict, query)
+        scan = time.perf_counter() - start
+        start = time.perf_counter()
+        found = index.find_similar(query)
+        indexed = time.perf_counter() - start
+        assert sorted(found) == sorted(scanned)
+        start = time.perf_counter()
+        index.find(query, tones=False)
+        toneless = time.perf_counter() - start
+        print('%-12s scan %.3fs  find_similar %.4fs (%.0fx)  '
+              'toneless find %.4fs' % (query, scan, indexed, scan / indexed,
+                                       toneless))
@@ -0,0 +1,42 @@
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+WORDS = 120000
+CHARACTERS = 500000  # a long novel
+LINE_LENGTH = 50
+
+
+def synthetic_text(seed=0):
+    """ A dictionary and lines of text made from its words. """
+
+    rand = random.Random(seed)
+    words = [''.join(chr(0x4E00 + rand.randrange(3000))
+                     for _ in range(rand.choice((1, 2, 2, 2, 3, 4))))
+             for _ in range(WORDS)]
+    text = []
+    length = 0
+    while length < CHARACTERS:
+        line = ''.join(rand.choice(words) for _ in range(LINE_LENGTH // 2))
+        text.append(line + '。')
+        length += len(line) + 1
+    return words, text
+
+
+if __name__ == '__main__':
+    words, lines = synthetic_text()
+    frequencies = pyjiong.char_frequency(''.join(lines[:100]))
+    start = time.perf_counter()
+    segmenter = pyjiong.Segmenter(words, frequencies)
+    print('build, %d words: %.2fs' % (len(words),
+                                      time.perf_counter() - start))
+    for processes in (None, 4):
+        start = time.perf_counter()
+        count = sum(len(w) for w in segmenter.segment_many(
+            lines, processes=processes))
+        elapsed = time.perf_counter() - start
+        print('segment_many, %d characters, processes=%s: %.2fs '
+              '(%d words)' % (CHARACTERS, processes, elapsed, count))
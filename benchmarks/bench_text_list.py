@@ -0,0 +1,86 @@
+"""
+Peak memory of reading and writing a large skritter/pleco list.
+
+Compares reading the whole file with open_text_list to streaming it with
+iter_text_list, and save_text_list with a list of words to a generator.
+"""
+import os
+import random
+import sys
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+ENTRIES = 500000
+SECTION_SIZE = 50
+
+
+def synthetic_list(path, size, seed=0):
+    """ Write a pleco-style list with sections of SECTION_SIZE words. """
+
+    rand = random.Random(seed)
+    syllables = pyjiong.PINYIN_SYLLABLES[:200]
+    with open(path, mode='w', encoding='utf-8') as list_file:
+        for number in range(size):
+            if number % SECTION_SIZE == 0:
+                list_file.write('//Book %d/Lesson %d\n' % (
+                    number // 10000, number // SECTION_SIZE))
+            length = rand.choice((1, 2, 2, 3))
+            simp = ''.join(chr(0x4E00 + rand.randrange(3000))
+                           for _ in range(length))
+            pinyin = ''.join(rand.choice(syllables) + str(rand.randint(1, 5))
+                             for _ in range(length))
+            list_file.write('%s[%s]\t%s\tdefinition %d\n' % (
+                simp, simp[::-1], pinyin, number))
+
+
+def peak(function):
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, result
+
+
+def read_all(path):
+    with open(path, mode='r', encoding='utf-8') as list_file:
+        return len(pyjiong.open_text_list(list_file)[1])
+
+
+def read_streaming(path):
+    count = 0
+    with open(path, mode='r', encoding='utf-8') as list_file:
+        for section, word in pyjiong.iter_text_list(list_file):
+            count += word is not None
+    return count
+
+
+def copy_list(path, streaming):
+    sections = []
+    with open(path, mode='r', encoding='utf-8') as list_file:
+        events = pyjiong.iter_text_list(list_file)
+        if streaming:
+            # the sections have to be known before their first word
+            words = (word for section, word in events
+                     if word is not None or sections.append(section))
+        else:
+            sections, words = pyjiong.open_text_list(list_file)
+        with open(os.devnull, mode='w', encoding='utf-8') as out_file:
+            pyjiong.save_text_list(out_file, sections, words)
+
+
+if __name__ == '__main__':
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'bench_text_list.txt')
+    synthetic_list(path, ENTRIES)
+    try:
+        for name, function in (
+                ('open_text_list', lambda: read_all(path)),
+                ('iter_text_list', lambda: read_streaming(path)),
+                ('read + save', lambda: copy_list(path, False)),
+                ('stream + save', lambda: copy_list(path, True))):
+            size, _ = peak(function)
+            print('%-15s %d entries: peak %6.1f MB' % (name, ENTRIES,
+                                                      size / 1e6))
+    finally:
+        os.remove(path)
@@ -0,0 +1,58 @@
+"""
+Time of open_text_list and open_text_list_parallel for a large list, and of
+ChList.open_file and ChList.open_file_parallel.
+
+Usage: python bench_text_list_parallel.py [path/to/list.txt]
+Without a path, a synthetic list is used (see bench_text_list.py).
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+from bench_text_list import synthetic_list
+
+ENTRIES = 2000000
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'bench_text_list_parallel.txt')
+        synthetic_list(path, ENTRIES)
+    try:
+        start = time.perf_counter()
+        with open(path, mode='r', encoding='utf-8') as list_file:
+            expected = pyjiong.open_text_list(list_file)
+        serial = time.perf_counter() - start
+        print('open_text_list: %.2fs, %d entries' % (serial,
+                                                     len(expected[1])))
+        for processes in (1, 2, 4, 8):
+            start = time.perf_counter()
+            result = pyjiong.open_text_list_parallel(path,
+                                                     processes=processes)
+            elapsed = time.perf_counter() - start
+            print('open_text_list_parallel, processes=%d: %.2fs '
+                  '(%.1fx, same result: %s)' % (
+                      processes, elapsed, serial / elapsed,
+                      result == expected))
+        start = time.perf_counter()
+        with open(path, mode='r', encoding='utf-8') as list_file:
+            expected = pyjiong.ChList('list', list_file)
+        serial = time.perf_counter() - start
+        print('ChList.open_file: %.2fs' % serial)
+        expected = [word.as_dict() for word in expected.words]
+        for processes in (1, 2, 4, 8):
+            result = pyjiong.ChList('list')
+            start = time.perf_counter()
+            result.open_file_parallel(path, processes=processes)
+            elapsed = time.perf_counter() - start
+            print('ChList.open_file_parallel, processes=%d: %.2fs '
+                  '(%.1fx, same result: %s)' % (
+                      processes, elapsed, serial / elapsed,
+                      [word.as_dict() for word in result.words] == expected))
+    finally:
+        if len(sys.argv) < 2:
+            os.remove(path)
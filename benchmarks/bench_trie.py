@@ -0,0 +1,66 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pyjiong
+
+WORDS = 240000
+TEXT_LENGTH = 200000
+
+
+def synthetic_words(size, seed=0):
+    """ Words of 1-4 characters from the 3000 most common code points. """
+
+    rand = random.Random(seed)
+    return [''.join(chr(0x4E00 + rand.randrange(3000))
+                    for _ in range(rand.choice((1, 2, 2, 2, 3, 4))))
+            for _ in range(size)]
+
+
+def set_longest_prefix(words, text, pos, max_length=4):
+    """ The naive way: try all lengths against a set. """
+
+    for end in range(min(len(text), pos + max_length), pos, -1):
+        if text[pos:end] in words:
+            return text[pos:end]
+    return ''
+
+
+if __name__ == '__main__':
+    words = synthetic_words(WORDS)
+    rand = random.Random(1)
+    text = ''.join(rand.choice(words) for _ in range(TEXT_LENGTH // 2))
+    word_set = set(words)
+
+    start = time.perf_counter()
+    trie = pyjiong.HeadwordTrie(words)
+    build = time.perf_counter() - start
+    del trie
+    tracemalloc.start()
+    trie = pyjiong.HeadwordTrie(words)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('build, %d words: %.2fs, %.1f MB' % (len(trie), build, size / 1e6))
+
+    start = time.perf_counter()
+    for pos in range(len(text)):
+        trie.longest_prefix(text, pos)
+    elapsed = time.perf_counter() - start
+    print('longest_prefix: %d positions/s' % (len(text) / elapsed))
+    assert all(trie.longest_prefix(text, pos) ==
+               set_longest_prefix(word_set, text, pos)
+               for pos in range(0, len(text), 97))
+
+    prefixes = [word[:1] for word in words[:2000]]
+    start = time.perf_counter()
+    for prefix in prefixes:
+        trie.complete(prefix, 10)
+    elapsed = time.perf_counter() - start
+    print('complete(prefix, 10): %d queries/s' % (len(prefixes) / elapsed))
+    start = time.perf_counter()
+    for prefix in prefixes[:50]:
+        sorted(w for w in word_set if w.startswith(prefix))[:10]
+    elapsed = time.perf_counter() - start
+    print('scanning all keys:    %d queries/s' % (50 / elapsed))
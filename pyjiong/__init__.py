@@ -1,3 +1,12 @@
 from pyjiong.tools import *
 from pyjiong.filesupport import *
 from pyjiong.chlist import *
+from pyjiong.pinyinindex import *
+from pyjiong.cedictindex import *
+from pyjiong.trie import *
+from pyjiong.segmenter import *
+from pyjiong.converter import *
+from pyjiong.annotator import *
+from pyjiong.radicals import *
+from pyjiong.sentenceindex import *
+from pyjiong.learnability import *
@@ -0,0 +1,225 @@
+from functools import lru_cache
+from html import escape
+from itertools import zip_longest
+from multiprocessing import Pool
+from pyjiong.segmenter import Segmenter
+from pyjiong.tools import (only_hanzi, pinyin_mark_to_num, pinyin_normalize,
+                           pinyin_num_to_mark)
+
+PINYIN_STYLES = ('num', 'mark', 'html')
+
+
+def _cedict_pinyin(cedict):
+    """ Return a dict word -> tuple of syllables with tone numbers. """
+
+    word_pinyin = {}
+    for key, entries in cedict.items():
+        # prefer readings of common words over those of names (Ma3 / ma3)
+        entries = sorted(entries, key=lambda entry: entry[1][:1].isupper())
+        syllables = tuple(pinyin_normalize(entries[0][1]).split())
+        word_pinyin.setdefault(key, syllables)
+        for entry in entries:
+            word_pinyin.setdefault(entry[0], syllables)
+    return word_pinyin
+
+
+def _unihan_pinyin(unihan):
+    """
+    Return a dict character -> syllable with tone number.
+
+    Args:
+        unihan: the output of open_unihan or open_unihan_dir
+    """
+
+    if hasattr(unihan, 'columns'):  # UnihanColumns
+        readings = dict(unihan.columns.get('kHanyuPinyin', {}))
+        readings.update((code_point, value) for code_point, value
+                        in unihan.columns.get('kMandarin', {}).items()
+                        if value)
+        char_readings = ((chr(code_point), value)
+                         for code_point, value in readings.items())
+    else:
+        char_readings = ((char, values.get('kMandarin') or
+                          values.get('kHanyuPinyin'))
+                         for char, values in unihan.items())
+    char_pinyin = {}
+    for char, readings in char_readings:
+        if readings:
+            char_pinyin[char] = pinyin_mark_to_num(readings[0].strip())
+    return char_pinyin
+
+
+class PinyinAnnotator(object):
+    """
+    Add pinyin to chinese text.
+
+    The text is split into words with a Segmenter, each word gets the
+    pinyin of its cedict entry; characters of words which are not in cedict
+    get the pinyin of their first kMandarin/kHanyuPinyin reading in unihan.
+    The pinyin for a word is cached in an LRU cache, so frequent words are
+    only looked up and converted once.
+
+    Args:
+        cedict (dict): the output of open_cedict, trad or simp
+        unihan: the output of open_unihan or open_unihan_dir with
+            kMandarin and/or kHanyuPinyin, optional
+        frequencies: word frequencies for the Segmenter, optional
+        cache_size (int): number of (word, style) combinations cached
+    """
+
+    def __init__(self, cedict, unihan=None, frequencies=None,
+                 cache_size=65536):
+        self.segmenter = Segmenter.from_cedict(cedict, frequencies)
+        self._word_pinyin = _cedict_pinyin(cedict)
+        self._char_pinyin = _unihan_pinyin(unihan) if unihan else {}
+        self.cache_size = cache_size
+        self.word_to_pinyin = lru_cache(maxsize=cache_size)(
+            self._word_to_pinyin)
+
+    def __getstate__(self):
+        # the cache can't be pickled (for process pools), create a new one
+        state = self.__dict__.copy()
+        del state['word_to_pinyin']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.word_to_pinyin = lru_cache(maxsize=self.cache_size)(
+            self._word_to_pinyin)
+
+    def _syllables(self, word):
+        """ Return the syllables of word, None for unknown characters. """
+
+        if word in self._word_pinyin:
+            return list(self._word_pinyin[word])
+        return [self._char_pinyin.get(char) for char in word]
+
+    def _word_to_pinyin(self, word, style='mark'):
+        """
+        Return the pinyin of one word, e.g. 'Xī'ān' or 'xi1an1'.
+
+        Unknown characters are kept as they are.
+        """
+
+        syllables = self._syllables(word)
+        result = []
+        # cedict sometimes has more or less syllables than characters
+        for no, (char, syllable) in enumerate(zip_longest(word, syllables)):
+            if syllable is None:
+                result.append(char)
+            elif style == 'num':
+                result.append(syllable)
+            else:
+                syllable = pinyin_num_to_mark(syllable)
+                # apostrophe before syllables starting with a, e, o
+                if no and syllable[:1].lower() in 'aāáǎàeēéěèoōóǒò':
+                    syllable = "'" + syllable
+                result.append(syllable)
+        return ''.join(result)
+
+    def annotate(self, text, style='mark'):
+        """
+        Return text with pinyin.
+
+        Args:
+            text (str): any text, everything which isn't hanzi is kept
+            style ('num'/'mark'/'html'): plain pinyin with tone numbers,
+                with tone marks, or html with each word in a ruby tag,
+                e.g. for '中国人好': 'zhong1guo2ren2 hao3',
+                'zhōngguórén hǎo' or
+                '<ruby>中国人<rt>zhōngguórén</rt></ruby><ruby>好<rt>hǎo</rt>'
+                '</ruby>'
+        """
+
+        if style not in PINYIN_STYLES:
+            raise ValueError('style must be one of %s, not %r'
+                             % (', '.join(PINYIN_STYLES), style))
+        word_to_pinyin = self.word_to_pinyin
+        result = []
+        previous_hanzi = False
+        for word in self.segmenter.segment(text):
+            hanzi = only_hanzi(word[:1]) != ''
+            if style == 'html':
+                pinyin = word_to_pinyin(word, 'mark') if hanzi else word
+                if pinyin != word:
+                    result.append('<ruby>%s<rt>%s</rt></ruby>' % (
+                        escape(word), escape(pinyin)))
+                else:
+                    result.append(escape(word))
+            else:
+                if hanzi:
+                    if previous_hanzi:
+                        result.append(' ')
+                    result.append(word_to_pinyin(word, style))
+                else:
+                    result.append(word)
+            previous_hanzi = hanzi
+        return ''.join(result)
+
+    def annotate_many(self, texts, style='mark', processes=1,
+                      chunksize=64):
+        """
+        Yield annotate(text, style) for each string in texts, in order.
+
+        Args:
+            texts (iterable): e.g. the lines of a file
+            processes (int): number of worker processes, None: one per cpu,
+                1: no pool
+            chunksize (int): number of texts sent to a worker at once
+        """
+
+        if processes == 1:
+            for text in texts:
+                yield self.annotate(text, style)
+            return
+        with Pool(processes, initializer=_init_worker,
+                  initargs=(self,)) as pool:
+            jobs = ((text, style) for text in texts)
+            for annotated in pool.imap(_annotate_in_worker, jobs, chunksize):
+                yield annotated
+
+    def annotate_file(self, in_file, out_file, style='mark'):
+        """ Annotate a file object line by line, writing to out_file. """
+
+        for line in in_file:
+            out_file.write(self.annotate(line, style))
+
+    def annotate_files(self, paths, style='mark', processes=None):
+        """
+        Annotate many utf-8 files, each file in one worker process.
+
+        Args:
+            paths (list): tuples (input path, output path)
+            processes (int): number of worker processes, None: one per cpu,
+                1: no pool
+        """
+
+        jobs = [(in_path, out_path, style) for in_path, out_path in paths]
+        if processes == 1:
+            for job in jobs:
+                _annotate_file(self, *job)
+            return
+        with Pool(processes, initializer=_init_worker,
+                  initargs=(self,)) as pool:
+            pool.map(_annotate_file_in_worker, jobs, 1)
+
+_worker_annotator = None
+
+
+def _init_worker(annotator):
+    global _worker_annotator
+    _worker_annotator = annotator
+
+
+def _annotate_in_worker(job):
+    return _worker_annotator.annotate(*job)
+
+
+def _annotate_file(annotator, in_path, out_path, style):
+    with open(in_path, mode='r', encoding='utf-8') as in_file,\
+            open(out_path, mode='w', encoding='utf-8') as out_file:
+        annotator.annotate_file(in_file, out_file, style)
+
+
+def _annotate_file_in_worker(job):
+    _annotate_file(_worker_annotator, *job)
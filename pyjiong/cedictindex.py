@@ -0,0 +1,180 @@
+import mmap
+import struct
+from pyjiong.filesupport import iter_cedict
+
+CEDICT_INDEX_MAGIC = b'PJCIDX01'
+# file layout, all numbers little endian:
+#   magic, number of keys (I)
+#   absolute offset of each key record (I), in order of the utf-8 keys
+#   key records: key length (H), key, number of lines (H),
+#       (offset (I), length (I)) of each line
+#   the cedict lines, utf-8
+_HEADER = struct.Struct('<8sI')
+_OFFSET = struct.Struct('<I')
+_COUNT = struct.Struct('<H')
+_LINE = struct.Struct('<II')
+
+
+def build_cedict_index(cedict_file, index_file):
+    """
+    Write a sorted binary index of a cedict file for CedictIndex.
+
+    Each entry can be found under its traditional and simplified form.
+
+    Args:
+        cedict_file (file): the cedict file opened for reading in text mode
+        index_file (file): the index file opened for writing in binary mode
+    """
+
+    lines = []
+    key_lines = {}
+    for line in cedict_file:
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        for entry in iter_cedict((line,)):
+            line_no = len(lines)
+            lines.append(line.encode('utf-8'))
+            for key in set((entry.trad, entry.simp)):
+                key_lines.setdefault(key.encode('utf-8'), []).append(line_no)
+
+    keys = sorted(key_lines)
+    records_start = _HEADER.size + _OFFSET.size * len(keys)
+    records_size = sum(2 * _COUNT.size + len(key) +
+                       _LINE.size * len(key_lines[key]) for key in keys)
+
+    line_offsets = []
+    position = records_start + records_size
+    for line in lines:
+        line_offsets.append(position)
+        position += len(line)
+
+    index_file.write(_HEADER.pack(CEDICT_INDEX_MAGIC, len(keys)))
+    position = records_start
+    for key in keys:
+        index_file.write(_OFFSET.pack(position))
+        position += (2 * _COUNT.size + len(key) +
+                     _LINE.size * len(key_lines[key]))
+    for key in keys:
+        index_file.write(_COUNT.pack(len(key)) + key +
+                         _COUNT.pack(len(key_lines[key])))
+        for line_no in key_lines[key]:
+            index_file.write(_LINE.pack(line_offsets[line_no],
+                                        len(lines[line_no])))
+    for line in lines:
+        index_file.write(line)
+
+
+class CedictIndex(object):
+    """
+    Look up words in an index file written by build_cedict_index.
+
+    The file is memory-mapped, nothing is parsed up front, so opening is
+    instant and processes using the same file share it in the page cache.
+    Lookups are binary searches over the sorted keys, only the matching
+    cedict lines are parsed.
+
+    Args:
+        path (str): the index file
+    """
+
+    def __init__(self, path):
+        self._file = open(path, mode='rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError('%s is not a cedict index' % path)
+        magic, self._length = _HEADER.unpack_from(self._map, 0)
+        if magic != CEDICT_INDEX_MAGIC:
+            self.close()
+            raise ValueError('%s is not a cedict index' % path)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._length
+
+    def _record(self, i):
+        """ Return (key bytes, position after the key) of the i-th key. """
+
+        position = _OFFSET.unpack_from(
+            self._map, _HEADER.size + _OFFSET.size * i)[0]
+        key_length = _COUNT.unpack_from(self._map, position)[0]
+        position += _COUNT.size
+        return (self._map[position:position + key_length],
+                position + key_length)
+
+    def _entries(self, position):
+        """ Parse the lines of the key record continuing at position. """
+
+        count = _COUNT.unpack_from(self._map, position)[0]
+        position += _COUNT.size
+        lines = []
+        for _ in range(count):
+            offset, length = _LINE.unpack_from(self._map, position)
+            position += _LINE.size
+            lines.append(self._map[offset:offset + length].decode('utf-8'))
+        return list(iter_cedict(lines))
+
+    def _bisect(self, key):
+        """ Return the position of the first key >= key (bytes). """
+
+        low = 0
+        high = self._length
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, key):
+        """
+        Return all entries with key as traditional or simplified form.
+
+        Returns:
+            entries (list): CedictEntry tuples, see iter_cedict, empty if
+                key isn't in the dictionary
+        """
+
+        key = key.encode('utf-8')
+        i = self._bisect(key)
+        if i < self._length:
+            found, position = self._record(i)
+            if found == key:
+                return self._entries(position)
+        return []
+
+    def __contains__(self, key):
+        key = key.encode('utf-8')
+        i = self._bisect(key)
+        return i < self._length and self._record(i)[0] == key
+
+    def prefix(self, prefix):
+        """
+        Yield (key, entries) for all keys starting with prefix, in order.
+        """
+
+        prefix = prefix.encode('utf-8')
+        for i in range(self._bisect(prefix), self._length):
+            key, position = self._record(i)
+            if not key.startswith(prefix):
+                break
+            yield (key.decode('utf-8'), self._entries(position))
+
+    def keys(self):
+        """ Yield all keys in order. """
+
+        for i in range(self._length):
+            yield self._record(i)[0].decode('utf-8')
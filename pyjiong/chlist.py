@@ -1,8 +1,15 @@
 #from __future__ import unicode_literals
 #from __future__ import print_function
 #from __future__ import division
-from pyjiong.filesupport import open_text_list, save_text_list
+from pyjiong.filesupport import (TEXT_FILE_DEFAULT, iter_text_list,
+                                 open_text_list_parallel, save_text_list)
+from pyjiong.tools import PinyinSimilarity, pinyin_tokenize
 import copy
+import gc
+import keyword
+from contextlib import contextmanager
+from array import array
+from bisect import bisect_right, insort
 
 PLECO_NL = '\ueab1'     # new line
 PLECO_BO = '\ueab2'     # bold opening tag
@@ -20,20 +27,231 @@ example, you'd want EAC1 800F 8F00, then the character, then EAC2."
 """
 
 
+_CHWORD_ATTRIBUTES = ('simp', 'trad', 'pinyin', 'definition', 'section',
+                      'number')
+
+
 class ChWord(object):
-    def __init__(self, attributes={}):
+    """
+    A word of a ChList.
+
+    The default attributes are stored in slots, which needs much less
+    memory than a dictionary per word. Any other attribute (e.g. from a
+    custom attr_order) can be set as usual, the instance dictionary for
+    those is only created when the first one is set (or __dict__ is read).
+
+    Args:
+        attributes (dict): the attributes of the word, e.g. from
+            open_text_list
+    """
 
-        for name, value in attributes.items():
-            setattr(self, name, value)
+    __slots__ = _CHWORD_ATTRIBUTES + ('__dict__',)
+
+    def __init__(self, attributes=None):
 
         # some defaults
-        for name in ['simp', 'trad', 'pinyin', 'definition']:
-            if not hasattr(self, name):
-                setattr(self, name, '')
+        self.simp = self.trad = self.pinyin = self.definition = ''
+        self.section = self.number = -1
 
-        for name in ['section', 'number']:
-            if not hasattr(self, name):
-                setattr(self, name, -1)
+        if attributes:
+            for name, value in attributes.items():
+                setattr(self, name, value)
+
+    def as_dict(self, names=None):
+        """
+        Return the attributes of the word as a new dictionary.
+
+        Args:
+            names (iterable): only these attributes, '' for those the word
+                doesn't have. Without names, all attributes are returned,
+                which creates the instance dictionary if there is none.
+        """
+
+        if names is not None:
+            return dict((name, getattr(self, name, '')) for name in names)
+        attributes = dict((name, getattr(self, name))
+                          for name in _CHWORD_ATTRIBUTES)
+        attributes.update(self.__dict__)
+        return attributes
+
+
+def _word_maker(names):
+    """
+    Return a function creating a ChWord from the values of names.
+
+    Like collections.namedtuple, the function is generated from source: it
+    assigns each value to its attribute and the defaults to the other slots.
+    That is about three times faster than ChWord(dict(zip(names, values))).
+    """
+
+    values = ['v%d' % no for no in range(len(names))]
+    lines = ['def make_word(%s):' % ', '.join(values),
+             '    word = new(ChWord)']
+    for name in _CHWORD_ATTRIBUTES:
+        if name not in names:
+            lines.append('    word.%s = %r' % (
+                name, -1 if name in ('section', 'number') else ''))
+    for name, value in zip(names, values):
+        if name.isidentifier() and not keyword.iskeyword(name):
+            lines.append('    word.%s = %s' % (name, value))
+        else:
+            lines.append('    setattr(word, %r, %s)' % (name, value))
+    lines.append('    return word')
+    namespace = {'new': object.__new__, 'ChWord': ChWord}
+    exec('\n'.join(lines), namespace)
+    return namespace['make_word']
+
+
+@contextmanager
+def _collection_paused():
+    """
+    Pause the garbage collector while creating many words.
+
+    ChWords are tracked by the garbage collector, so creating a million of
+    them starts a lot of collections which find nothing, this more than
+    doubles the time needed.
+    """
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _saved_attributes(custom):
+    """ Return the names of the attributes save_text_list needs. """
+
+    attr_order = (custom or {}).get('attr_order',
+                                    TEXT_FILE_DEFAULT['attr_order'])
+    names = ['section', 'number']
+    for name in attr_order:
+        if name == 'simp[trad]':
+            names.extend(('simp', 'trad'))
+        else:
+            names.append(name)
+    return names
+
+
+class _WordList(list):
+    """
+    The list of words of a ChList, counting changes in version.
+
+    Indexes of a ChList are only valid for the version they were created
+    for, so changing the list directly (e.g. chlist.words.append(word))
+    invalidates them. ChList.append etc. change the list without a new
+    version and update the indexes instead.
+    """
+
+    version = 0
+
+
+def _count_changes(name):
+    method = getattr(list, name)
+
+    def changed(self, *args):
+        self.version += 1
+        return method(self, *args)
+    changed.__name__ = name
+    return changed
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append',
+              'extend', 'insert', 'pop', 'remove', 'clear', 'sort',
+              'reverse'):
+    setattr(_WordList, _name, _count_changes(_name))
+
+
+def _index_items(word, attribute_name, iterate):
+    """ Return the index keys of a word, None without the attribute. """
+
+    # skip words which don't have this attribute
+    if not hasattr(word, attribute_name):
+        return None
+    content = getattr(word, attribute_name)
+    # create list of items of this attribute if itereate == True,
+    # e.g. for 你好 -> ['你','好']
+    return list(content) if iterate else [content]
+
+
+COMBINE_OPERATIONS = ('union', 'intersection', 'difference', 'exactly')
+
+
+def _combine(word_lists, attribute_name, iterate, operation, k, primary):
+    """
+    Yield (source, position, section source, section) for ChList.combine.
+
+    The word is word_lists[source][position], its section is an index into
+    the sections of the list number section source.
+    """
+
+    if operation not in COMBINE_OPERATIONS:
+        raise ValueError('operation must be one of %s, not %r'
+                         % (', '.join(COMBINE_OPERATIONS), operation))
+    if operation == 'exactly' and k is None:
+        raise ValueError("k is needed for operation 'exactly'")
+    wanted = {'union': None, 'intersection': len(word_lists),
+              'difference': 1, 'exactly': k}[operation]
+    primary_bit = 1 << primary
+    all_lists = (1 << len(word_lists)) - 1
+
+    # the shared index: value (or item) -> bit mask of the lists having it
+    masks = {}
+    first_positions = {}  # item -> first position in the primary list
+    for list_no, words in enumerate(word_lists):
+        bit = 1 << list_no
+        for no, word in enumerate(words):
+            for item in _index_items(word, attribute_name, iterate) or ():
+                masks[item] = masks.get(item, 0) | bit
+                if list_no == primary:
+                    first_positions.setdefault(item, no)
+
+    def is_wanted(word):
+        items = _index_items(word, attribute_name, iterate)
+        if items is None:
+            return (False, 0)
+        if iterate:
+            # only if all items are in a list, the word is also in it
+            mask = all_lists
+            for item in items:
+                mask &= masks[item]
+        else:
+            mask = masks[items[0]]
+        return (wanted is None or bin(mask).count('1') == wanted, mask)
+
+    # words of the other lists go after the word of the primary list with
+    # the last of their items (iterate) or after all words of the primary
+    # list, each value only once
+    placed = {}
+    rest = []
+    seen = set(getattr(word, attribute_name) for word in word_lists[primary]
+               if hasattr(word, attribute_name))
+    for list_no, words in enumerate(word_lists):
+        if list_no == primary or operation == 'difference':
+            continue
+        for no, word in enumerate(words):
+            is_new, mask = is_wanted(word)
+            content = getattr(word, attribute_name, None)
+            if not is_new or content in seen:
+                continue
+            seen.add(content)
+            if mask & primary_bit and word_lists[primary]:
+                in_primary_pos = max([first_positions[item]
+                                      for item in content] or [0])
+                placed.setdefault(in_primary_pos, []).append(
+                    (list_no, no, primary,
+                     word_lists[primary][in_primary_pos].section))
+            else:
+                rest.append((list_no, no, list_no, word.section))
+
+    for no, word in enumerate(word_lists[primary]):
+        if is_wanted(word)[0]:
+            yield (primary, no, primary, word.section)
+        for item in placed.get(no, ()):
+            yield item
+    for item in rest:
+        yield item
 
 
 class ChList(object):
@@ -47,16 +265,49 @@ class ChList(object):
         if not words:
             words = []
         self.words = words
+        self.index_hits = 0
+        self.index_rebuilds = 0
 
         if list_file:
             self.open_file(list_file, custom)
 
+    @property
+    def words(self):
+        return self._words
+
+    @words.setter
+    def words(self, words):
+        self._words = _WordList(words)
+        # indexes created so far: (attribute, iterate) -> (version, index)
+        self._indexes = {}
+
     def open_file(self, list_file, custom=None):
-        self.sections, temp_words = open_text_list(list_file, custom)
-        self.words = [ChWord(attr_dic) for attr_dic in temp_words]
+        self.sections = []
+        words = []
+        with _collection_paused():
+            for section, attr_dic in iter_text_list(list_file, custom):
+                if attr_dic is None:
+                    self.sections.append(section)
+                else:
+                    words.append(ChWord(attr_dic))
+        self.words = words
+
+    def open_file_parallel(self, path, custom=None, processes=None,
+                           chunk_size=1 << 22):
+        """
+        Open a large list file using open_text_list_parallel.
+
+        The ChWords are created directly from the values sent back by the
+        worker processes, without a dictionary for each word.
+        """
+
+        with _collection_paused():
+            self.sections, self.words = open_text_list_parallel(
+                path, custom, processes, chunk_size, _word_maker)
 
     def save_file(self, list_file, custom=None):
-        temp_words = [word.__dict__ for word in self.words]
+        names = _saved_attributes(custom)
+        temp_words = (word.as_dict(names) for word in self.words)
         save_text_list(list_file, self.sections, temp_words, custom)
 
     def create_index(self, attribute_name, iterate=False):
@@ -89,32 +340,170 @@ class ChList(object):
         the words having the value in word.attribute_name as values. This list
         only contains the index of the word in self.words, not the word object
         itself. Also, the list is sorted in order of self.words.
+
+        The index is kept up to date by append, extend, remove and set_attr,
+        so it is only created again after self.words was changed directly.
         """
-        new_index = {}
         if iterate:
             suffix = '_ii'
         else:
             suffix = '_i'
-        for no, word in enumerate(self.words):
-            # skip words which don't have this attribute
-            if hasattr(word, attribute_name):
-                content = getattr(word, attribute_name)
-            else:
+        setattr(self, attribute_name + suffix,
+                self.get_index(attribute_name, iterate))
+
+    def get_index(self, attribute_name, iterate=False):
+        """
+        Return an index like create_index, without adding an attribute.
+
+        The index is cached until self.words is changed directly, see
+        index_stats.
+        """
+        key = (attribute_name, iterate)
+        version = self._words.version
+        if key in self._indexes and self._indexes[key][0] == version:
+            self.index_hits += 1
+            return self._indexes[key][1]
+
+        self.index_rebuilds += 1
+        new_index = {}
+        for no, word in enumerate(self._words):
+            items = _index_items(word, attribute_name, iterate)
+            if items is None:
                 continue
-            # create list of items of this attribute if itereate == True,
-            # e.g. for 你好 -> ['你','好']
-            if iterate:
-                items = list(content)
-            else:
-                items = [content]
             for item in items:
                 if item in new_index:
                     new_index[item].append(no)
                 else:
                     new_index[item] = [no]
-        setattr(self, attribute_name + suffix, new_index)
+        self._indexes[key] = (version, new_index)
+        return new_index
+
+    def indexes(self):
+        """ Return a list of (attribute, iterate) of the valid indexes. """
+
+        version = self._words.version
+        return [key for key, (index_version, _) in self._indexes.items()
+                if index_version == version]
+
+    def index_stats(self):
+        """
+        Return a dictionary with the index hits and rebuilds so far.
+
+        A hit is an index returned from the cache, a rebuild an index which
+        had to be created from self.words.
+        """
+        return {'hits': self.index_hits, 'rebuilds': self.index_rebuilds}
+
+    def lookup(self, attribute_name, value, iterate=False):
+        """
+        Return the words with word.attribute_name == value.
+
+        With iterate=True, the words containing value, e.g. a character.
+        """
+        index = self.get_index(attribute_name, iterate)
+        return [self._words[no] for no in index.get(value, ())]
 
-    def mix_with(self, list2, attribute, iterate=False):
+    def _valid_indexes(self):
+        """ Yield (attribute, iterate, index), dropping invalid indexes. """
+
+        version = self._words.version
+        for key, (index_version, index) in list(self._indexes.items()):
+            if index_version == version:
+                yield (key[0], key[1], index)
+            else:
+                del self._indexes[key]
+
+    def append(self, word):
+        """ Append a word, updating the indexes. """
+
+        no = len(self._words)
+        list.append(self._words, word)
+        for attribute_name, iterate, index in self._valid_indexes():
+            for item in _index_items(word, attribute_name, iterate) or ():
+                index.setdefault(item, []).append(no)
+
+    def extend(self, words):
+        """ Append words, updating the indexes. """
+
+        for word in words:
+            self.append(word)
+
+    def remove(self, word):
+        """
+        Remove a word (the same object, not an equal one).
+
+        The positions of all following words in the indexes are updated.
+        """
+        no = next((no for no, list_word in enumerate(self._words)
+                   if list_word is word), None)
+        if no is None:
+            raise ValueError('word not in list')
+        list.__delitem__(self._words, no)
+        for attribute_name, iterate, index in self._valid_indexes():
+            for item in set(_index_items(word, attribute_name, iterate)
+                            or ()):
+                index[item] = [n for n in index[item] if n != no]
+                if not index[item]:
+                    del index[item]
+            for numbers in index.values():
+                for pos in range(bisect_right(numbers, no), len(numbers)):
+                    numbers[pos] -= 1
+
+    def set_attr(self, no, attribute_name, value):
+        """
+        Set an attribute of the word self.words[no], updating the indexes.
+        """
+        word = self._words[no]
+        indexes = [(iterate, index) for attribute, iterate, index
+                   in self._valid_indexes() if attribute == attribute_name]
+        for iterate, index in indexes:
+            for item in set(_index_items(word, attribute_name, iterate)
+                            or ()):
+                index[item] = [n for n in index[item] if n != no]
+                if not index[item]:
+                    del index[item]
+        setattr(word, attribute_name, value)
+        for iterate, index in indexes:
+            for item in _index_items(word, attribute_name, iterate):
+                insort(index.setdefault(item, []), no)
+
+    def find_confusables(self, margins=None, in_groups=None,
+                         fin_groups=None, attribute='pinyin'):
+        """
+        Find pairs of words with similar pronunciation.
+
+        Two words are confusable if they have the same number of syllables
+        and each pair of syllables is similar according to
+        pinyin_are_similar with the given margins and groups. Words are put
+        into buckets by their PinyinSimilarity.signature first, so only
+        words within the same bucket have to be compared.
+
+        Args:
+            margins, in_groups, fin_groups: see pinyin_are_similar
+            attribute (string): the attribute holding the pinyin, with tone
+                marks or numbers, spaces between syllables are optional
+        Yields:
+            (no1, no2) for each pair of confusable words, no1 < no2 being
+            the indexes of the words in self.words. Words without pinyin
+            are skipped.
+        """
+        similarity = PinyinSimilarity(margins, in_groups, fin_groups)
+        buckets = {}
+        for no, word in enumerate(self.words):
+            splits = pinyin_tokenize(getattr(word, attribute, ''))
+            if splits:
+                key = (len(splits), similarity.signature(splits))
+                buckets.setdefault(key, []).append((no, splits))
+
+        similar = similarity.splits_are_similar
+        for bucket in buckets.values():
+            for pos, (no1, splits1) in enumerate(bucket):
+                for no2, splits2 in bucket[pos + 1:]:
+                    if all(similar(split1, split2) for split1, split2
+                           in zip(splits1, splits2)):
+                        yield (no1, no2)
+
+    def mix_with(self, list2, attribute, iterate=False, views=False):
         """ Mix self with another list while the order of self is kept.
 
         Args:
@@ -125,6 +514,8 @@ class ChList(object):
             iterate (bool): False if only whole words should be compared,
                 True if each character/item of word.attribute should be
                 considered
+            views (bool): return ChListViews instead of ChLists, no word
+                is copied until a view is materialized
         Returns:
             A tuple with three lists (ChList), the first one contains only
             words which are (according to comparisons with word.attribute) only
@@ -132,60 +523,55 @@ class ChList(object):
             list2 and the third one contains words which are only in list2 """
         # characters = iterated items of word, could also be something
         # different
+
+        # the lists contain tuples (source, position, section), source 0
+        # for words of self, 1 for words of list2
         only_self = []
         both_lists = []
         only_list2 = []
+        # the sort key of each item of both_lists
+        both_numbers = []
+        self_words = tuple(self.words)
+        list2_words = tuple(list2.words)
         if not iterate:
             # only complete words are compared
-            list2.create_index(attribute, False)
-            list2_i = getattr(list2, attribute + '_i')
-            only_list2 = list(list2.words)
+            list2_i = list2.get_index(attribute, False)
+            in_list2 = [False] * len(list2_words)
 
-            for word_o in self.words:
-                word = copy.copy(word_o)
+            for no, word in enumerate(self_words):
                 content = getattr(word, attribute)
                 if content in list2_i:
-                    both_lists.append(word)
+                    both_lists.append((0, no, word.section))
+                    both_numbers.append(word.number)
                     for number in list2_i[content]:
-                        only_list2[number] = None  # leaving only in list2
+                        in_list2[number] = True  # leaving only in list2
                 else:
-                    only_self.append(word)
-            only_list2 = [copy.copy(word) for word in only_list2 if word]
+                    only_self.append((0, no, word.section))
+            only_list2 = [(1, no, word.section) for no, word
+                          in enumerate(list2_words) if not in_list2[no]]
         else:
             # look at each character as part of a word
 
             # create indices
-            self.create_index(attribute, False)
-            self_i = getattr(self, attribute + '_i')
-            self.create_index(attribute, True)
-            list2.create_index(attribute, True)
-            self_ii = getattr(self, attribute + '_ii')
-            list2_ii = getattr(list2, attribute + '_ii')
+            self_i = self.get_index(attribute, False)
+            self_ii = self.get_index(attribute, True)
+            list2_ii = list2.get_index(attribute, True)
 
             # check for words with characters only in self
-            for word_o in self.words:
-                word = copy.copy(word_o)
+            for no, word in enumerate(self_words):
                 content = getattr(word, attribute)
-                items = list(content)
-                in_list2 = True
                 # only if all items are in list2, the word is also list2
-                for item in items:
-                    if item in list2_ii:
-                        pass
-                    else:
-                        in_list2 = False
-                if in_list2:
-                    both_lists.append(word)
+                if all(item in list2_ii for item in content):
+                    both_lists.append((0, no, word.section))
+                    both_numbers.append(word.number)
                 else:
-                    only_self.append(word)
+                    only_self.append((0, no, word.section))
 
-            for word_o in list2.words:
-                word = copy.copy(word_o)
+            for no, word in enumerate(list2_words):
                 content = getattr(word, attribute)
-                items = list(content)
                 in_self_pos = 0
 
-                for item in items:
+                for item in content:
                     if item in self_ii:
                         pos = self_ii[item][0]
                         # to get the order of self.words
@@ -200,65 +586,247 @@ class ChList(object):
                     # by the previous loop
                     if content not in self_i:
                         # just to make sure the order of list2 is kept
-                        word.number = in_self_pos +\
-                            (word.number / len(list2.words))
-                        word.section = self.words[in_self_pos].section
-                        both_lists.append(word)
+                        both_lists.append(
+                            (1, no, self_words[in_self_pos].section))
+                        both_numbers.append(
+                            in_self_pos + (word.number / len(list2_words)))
                 else:
-                    only_list2.append(word)
+                    only_list2.append((1, no, word.section))
 
         # bring those new items from the second loop into order with the
         # ones of the first loop
-        both_lists.sort(key=lambda w: w.number)
-
-        # create new word.numbers and delete unused sections
-        def organize(o_sections, words):
-            orig_sections = list(o_sections)  # creating a copy
-            used_sections = set()
-            new_sections = []
-            # new_words = [] what is this?
-
-            # find used sections and create new word numbers
-            for number, w in enumerate(words):
-                w.number = number
-                used_sections.add(w.section)
-            new_index = 0
-
-            # remove unused sections
-            for i, section in enumerate(orig_sections):
-                if i in used_sections:
-                    # replace list with integer pointing to
-                    # position in new list
-                    new_sections.append(section)
-                    # replace section name with index in new_sections
-                    orig_sections[i] = new_index
-                    new_index += 1
-
-            # update section number in words
-            for w in words:
-                if w.section > -1:
-                    w.section = orig_sections[w.section]
-            return (new_sections, words)
-
-        # clean up the lists
-        only_self = organize(self.sections, only_self)
-        both_lists = organize(self.sections, both_lists)
-        only_list2 = organize(list2.sections, only_list2)
+        order = sorted(range(len(both_lists)), key=both_numbers.__getitem__)
+        both_lists = [both_lists[pos] for pos in order]
 
         # new names
         only_self_name = self.name + '_minus_' + list2.name
         both_lists_name = self.name + '_intersecting_' + list2.name
         only_list2_name = list2.name + '_minus_' + self.name
 
-        # done!
-        only_self = ChList(only_self_name,
-                           sections=only_self[0],
-                           words=only_self[1])
-        both_lists = ChList(both_lists_name,
-                            sections=both_lists[0],
-                            words=both_lists[1])
-        only_list2 = ChList(only_list2_name,
-                            sections=only_list2[0],
-                            words=only_list2[1])
-
-        return (only_self, both_lists, only_list2)
+        words = (self_words, list2_words)
+        results = (ChListView(only_self_name, words, only_self,
+                              self.sections),
+                   ChListView(both_lists_name, words, both_lists,
+                              self.sections),
+                   ChListView(only_list2_name, words, only_list2,
+                              list2.sections))
+        if views:
+            return results
+        return tuple(view.materialize() for view in results)
+
+    @staticmethod
+    def iter_combine(lists, attribute, iterate=False, operation='union',
+                     k=None, primary=0):
+        """
+        Yield the words of a combination of lists, see combine.
+
+        Yields:
+            (word, section): the word of its source list (not a copy) and
+                the name of its section, a list like in ChList.sections,
+                or None
+        """
+        word_lists = tuple(tuple(chlist.words) for chlist in lists)
+        for source, no, section_source, section in _combine(
+                word_lists, attribute, iterate, operation, k, primary):
+            sections = lists[section_source].sections
+            yield (word_lists[source][no],
+                   sections[section] if -1 < section < len(sections)
+                   else None)
+
+    @staticmethod
+    def combine(lists, attribute, iterate=False, operation='union', k=None,
+                primary=0, name=None, views=False):
+        """
+        Combine any number of lists in one pass.
+
+        Like mix_with, but for many lists at once: one index with the
+        lists having each value (or item) is created for all lists, then
+        the words are filtered by the number of lists they are in. The
+        order and sections are those of the primary list, words of other
+        lists which aren't in it follow the primary list's word with the
+        last of their items (iterate=True) or come after all words of the
+        primary list, in the order of the lists. Each value is taken only
+        once from the other lists.
+
+        Args:
+            lists (list): the ChLists
+            attribute (string): the attribute to compare, see mix_with
+            iterate (bool): compare the items of the attribute, see
+                mix_with
+            operation (string): which words to keep:
+                'union': all words
+                'intersection': words in all lists
+                'difference': words of the primary list in no other list
+                'exactly': words in exactly k lists
+            k (int): the number of lists for 'exactly'
+            primary (int): the index of the primary list in lists
+            name (string): the name of the new list, default e.g.
+                'hsk_union_freq_tocfl'
+            views (bool): return a ChListView instead of a ChList, see
+                mix_with
+        Returns:
+            result (ChList or ChListView): sections which aren't used are
+                removed, sections of words of other lists are added after
+                those of the primary list
+
+        For two lists, 'difference' and 'intersection' are the first and
+        second list of mix_with (the latter for words numbered in order).
+        Use iter_combine to get the words without creating a list.
+        """
+        word_lists = tuple(tuple(chlist.words) for chlist in lists)
+        # all sections after each other, those of the primary list first,
+        # with the offset of each list
+        o_sections = list(lists[primary].sections)
+        offsets = []
+        for no, chlist in enumerate(lists):
+            if no == primary:
+                offsets.append(0)
+            else:
+                offsets.append(len(o_sections))
+                o_sections.extend(chlist.sections)
+        items = [(source, no, section + offsets[section_source]
+                  if section > -1 else section)
+                 for source, no, section_source, section in _combine(
+                     word_lists, attribute, iterate, operation, k, primary)]
+        if name is None:
+            if operation == 'exactly':
+                operation = 'exactly_%d' % k
+            name = '_'.join([lists[primary].name, operation] + [
+                chlist.name for no, chlist in enumerate(lists)
+                if no != primary])
+        view = ChListView(name, word_lists, items, o_sections)
+        if views:
+            return view
+        return view.materialize()
+
+
+class ChListView(object):
+    """
+    A list of words of other lists, without copies of the words.
+
+    The view keeps the position of each word in its source list and the
+    section it belongs to in the view, for mix_with and combine with
+    views=True. Like in a ChList, unused sections are removed and word
+    number n is the n-th word of the view. The words themselves are shared
+    with the source lists, so a view should be used as read-only:
+    everything which would change the view (e.g. accessing view.words or
+    calling any other ChList method) first materializes it, creating a
+    ChList with copies of the words, which is then used for all further
+    calls.
+
+    Args:
+        name (str): the name of the list
+        words (tuple): the words of each source list
+        items (list): tuples (source, position, section), the word is
+            words[source][position] and section its section in o_sections
+        o_sections (list): the sections the section of each item refers to
+    """
+
+    def __init__(self, name, words, items, o_sections):
+        self.name = name
+        self._words = words
+        self._sources = array('H', [item[0] for item in items])
+        self._positions = array('I', [item[1] for item in items])
+        self.sections, self._sections = self._organize(
+            o_sections, [item[2] for item in items])
+        self._materialized = None
+
+    @staticmethod
+    def _organize(o_sections, word_sections):
+        """ Return the used sections and new section of each word. """
+
+        orig_sections = list(o_sections)  # creating a copy
+        used_sections = set(word_sections)
+        new_sections = []
+        new_index = 0
+
+        # remove unused sections
+        for i, section in enumerate(orig_sections):
+            if i in used_sections:
+                # replace list with integer pointing to
+                # position in new list
+                new_sections.append(section)
+                # replace section name with index in new_sections
+                orig_sections[i] = new_index
+                new_index += 1
+
+        # update section number in words
+        return (new_sections, array('i', [
+            orig_sections[section] if section > -1 else section
+            for section in word_sections]))
+
+    def __len__(self):
+        if self._materialized is not None:
+            return len(self._materialized.words)
+        return len(self._positions)
+
+    def word(self, no):
+        """
+        Return word number no, the word of the source list.
+
+        Its number and section are those of the source list, see section.
+        """
+        if self._materialized is not None:
+            return self._materialized.words[no]
+        return self._words[self._sources[no]][self._positions[no]]
+
+    def section(self, no):
+        """ Return the section of word number no in self.sections. """
+
+        if self._materialized is not None:
+            return self._materialized.words[no].section
+        return self._sections[no]
+
+    def rows(self):
+        """ Yield (word, section) for all words, see word and section. """
+
+        if self._materialized is not None:
+            for word in self._materialized.words:
+                yield (word, word.section)
+            return
+        for source, position, section in zip(self._sources, self._positions,
+                                             self._sections):
+            yield (self._words[source][position], section)
+
+    def materialize(self):
+        """
+        Return a ChList with copies of the words, the same one every time.
+        """
+        if self._materialized is None:
+            words = []
+            for number, (word, section) in enumerate(self.rows()):
+                word = copy.copy(word)
+                word.number = number
+                word.section = section
+                words.append(word)
+            self._materialized = ChList(self.name, sections=self.sections,
+                                        words=words)
+            self._words = self._sources = self._positions = None
+            self._sections = None
+        return self._materialized
+
+    def get_index(self, attribute_name, iterate=False):
+        """ Return an index like ChList.get_index, it isn't cached. """
+
+        if self._materialized is not None:
+            return self._materialized.get_index(attribute_name, iterate)
+        new_index = {}
+        for no, (word, _) in enumerate(self.rows()):
+            for item in _index_items(word, attribute_name, iterate) or ():
+                new_index.setdefault(item, []).append(no)
+        return new_index
+
+    def save_file(self, list_file, custom=None):
+        """ Save the words like ChList.save_file, without copying them. """
+
+        names = _saved_attributes(custom)
+        temp_words = (dict(word.as_dict(names), section=section,
+                           number=number)
+                      for number, (word, section) in enumerate(self.rows()))
+        save_text_list(list_file, self.sections, temp_words, custom)
+
+    def __getattr__(self, name):
+        # everything else, e.g. words, is done by the materialized ChList
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
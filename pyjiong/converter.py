@@ -0,0 +1,139 @@
+from pyjiong.filesupport import iter_cedict
+from pyjiong.trie import HeadwordTrie
+
+
+class SimpTradConverter(object):
+    """
+    Convert text between simplified and traditional characters.
+
+    The mapping is built from the word pairs in cedict, so whole words are
+    converted (e.g. 头发 -> 頭髮, but 发现 -> 發現). The text is scanned
+    from left to right, always replacing the longest known word; other
+    characters are kept as they are. If a word has more than one
+    counterpart, the one found in most entries wins, for a tie the first.
+
+    Args:
+        pairs (iterable): tuples (trad, simp)
+        to ('trad'/'simp'): the target of the conversion
+    """
+
+    def __init__(self, pairs, to='trad'):
+        if to not in ('trad', 'simp'):
+            raise ValueError("to must be 'trad' or 'simp', not %r" % (to,))
+        self.to = to
+        counts = {}
+        for trad, simp in pairs:
+            source, target = (simp, trad) if to == 'trad' else (trad, simp)
+            targets = counts.setdefault(source, {})
+            targets[target] = targets.get(target, 0) + 1
+        self.table = {}
+        for source, targets in counts.items():
+            # max() returns the first of equal counts, dicts keep the order
+            self.table[source] = max(targets, key=targets.get)
+        self.trie = HeadwordTrie(self.table)
+        self.max_length = max([len(word) for word in self.table] or [1])
+
+    @classmethod
+    def from_cedict(cls, cedict, to='trad', key='trad'):
+        """
+        Create a converter from the output of open_cedict.
+
+        Args:
+            key ('trad'/'simp'): the key used for open_cedict
+        """
+
+        def pairs():
+            for char_key, entries in cedict.items():
+                for entry in entries:
+                    if key == 'trad':
+                        yield (char_key, entry[0])
+                    else:
+                        yield (entry[0], char_key)
+        return cls(pairs(), to)
+
+    @classmethod
+    def from_cedict_file(cls, cedict_file, to='trad'):
+        """ Create a converter from a cedict file. """
+
+        return cls(((e.trad, e.simp) for e in iter_cedict(cedict_file)), to)
+
+    def _convert_until(self, text, stop):
+        """
+        Convert text, only starting matches before position stop.
+
+        Returns:
+            (converted text, position where conversion stopped)
+        """
+
+        table = self.table
+        longest_prefix = self.trie.longest_prefix
+        result = []
+        pos = 0
+        while pos < stop:
+            word = longest_prefix(text, pos)
+            if word:
+                result.append(table[word])
+                pos += len(word)
+            else:
+                result.append(text[pos])
+                pos += 1
+        return (''.join(result), pos)
+
+    def convert(self, text):
+        """ Return the converted text. """
+
+        return self._convert_until(text, len(text))[0]
+
+    def convert_many(self, texts):
+        """ Yield convert(text) for each string in texts, e.g. a file. """
+
+        for text in texts:
+            yield self.convert(text)
+
+    def convert_file(self, in_file, out_file, chunk_size=1 << 16):
+        """
+        Convert a whole file, reading and writing it in chunks.
+
+        Words across the boundary of two chunks are converted correctly,
+        the length of lines doesn't matter.
+
+        Args:
+            in_file (file object): opened for reading in text mode
+            out_file (file object): opened for writing in text mode
+            chunk_size (int): number of characters read at once
+        """
+
+        # a match starting before len(buffer) - keep can't reach beyond
+        # the buffer, so everything before that can be converted
+        keep = self.max_length - 1
+        buffer = ''
+        while True:
+            chunk = in_file.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+            if len(buffer) > keep:
+                converted, pos = self._convert_until(buffer,
+                                                     len(buffer) - keep)
+                out_file.write(converted)
+                buffer = buffer[pos:]
+        out_file.write(self.convert(buffer))
+
+    def convert_chlist(self, chlist, overwrite=False):
+        """
+        Fill the trad (or simp) field of all words of a ChList.
+
+        With to == 'trad', word.trad is set to the converted word.simp and
+        the other way round for to == 'simp'.
+
+        Args:
+            chlist (ChList): the list, changed in place
+            overwrite (bool): also replace fields which are not empty
+        """
+
+        source, target = ('simp', 'trad') if self.to == 'trad' else\
+            ('trad', 'simp')
+        for no, word in enumerate(chlist.words):
+            text = getattr(word, source)
+            if text and (overwrite or not getattr(word, target)):
+                chlist.set_attr(no, target, self.convert(text))
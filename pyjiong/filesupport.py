@@ -2,7 +2,18 @@
 #from __future__ import print_function
 #from MaWord import *
 #from tools import *
-import re
+import glob
+import hashlib
+import io
+import os
+import pickle
+import sqlite3
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import count, islice, repeat, starmap
+from multiprocessing import Pool
 
 TEXT_FILE_DEFAULT = {
     'entry_delimiter': '\n',
@@ -15,6 +26,108 @@ TEXT_FILE_DEFAULT = {
     }
 
 
+def _text_list_format(custom):
+    """ Return custom with the missing values taken from TEXT_FILE_DEFAULT. """
+
+    if not custom:
+        return TEXT_FILE_DEFAULT
+    for k, v in TEXT_FILE_DEFAULT.items():
+        if k not in custom:
+            custom[k] = v
+    return custom
+
+
+def _iter_entries(word_file, delimiter, chunk_size):
+    """ Yield the stripped entries of a file, reading it in chunks. """
+
+    rest = ''
+    while True:
+        chunk = word_file.read(chunk_size)
+        if not chunk:
+            break
+        entries = (rest + chunk).split(delimiter)
+        # the last entry (or even the delimiter) may continue in the next chunk
+        rest = entries.pop()
+        for entry in entries:
+            yield entry.strip()
+    yield rest.strip()
+
+
+def _parse_entry(entry, custom):
+    """ Return a dict with the attributes of one entry of a list. """
+
+    attributes = entry.split(custom['attr_delimiter'])
+    new_word = {}
+    for (name, attribute) in zip(custom['attr_order'], attributes):
+        # special treatment for pleco files with simp[trad]
+        if name == 'simp[trad]':
+            if '[' in attribute:
+                if attribute.startswith('['):
+                    new_word['trad'] = attribute[1:-1]
+                else:
+                    new_word['simp'] = attribute[:attribute.find('[')]
+                    new_word['trad'] =\
+                            attribute[attribute.find('[') + 1:-1]
+            else:
+                new_word['simp'] = attribute
+        else:
+            new_word[name] = attribute
+    return new_word
+
+
+def iter_text_list(word_file, custom=None, chunk_size=1 << 16):
+    """
+    Read a list in the format used by skritter/pleco, entry by entry.
+
+    The file is read in chunks, so neither the file nor the list is held in
+    memory. A section is only yielded when the first word after it is read
+    (or at the end of the file), so like in open_text_list, a section
+    heading directly followed by another one is replaced by it.
+
+    Args:
+        word_file (file object): a file object opened to read the file
+        custom (dict): the file format, see open_text_list
+        chunk_size (int): number of characters read at once
+    Yields:
+        (section, word): either (section, None) for a new section, section
+            being a list with the complete section name, e.g.
+            ['Book 1', 'Chapter 1', 'Listing 1'], or (None, word) for a
+            word, word being a dictionary like those of open_text_list.
+            word['section'] is the number of sections yielded before minus
+            one.
+    """
+
+    custom = _text_list_format(custom)
+    comment_start = custom['comment_start']
+    sec_start = custom['sec_start']
+    sec_delimiter = custom['sec_delimiter']
+
+    current_section_no = -1
+    current_entry_no = -1
+    pending_section = None  # the last section heading, not yet yielded
+
+    for entry in _iter_entries(word_file, custom['entry_delimiter'],
+                               chunk_size):
+        if entry == '' or entry.startswith(comment_start):
+            pass
+        elif entry.startswith(sec_start):  # section heading
+            # overwrites an empty section
+            pending_section = entry[len(sec_start):].split(sec_delimiter)
+        else:                       # an entry
+            if pending_section is not None:
+                current_section_no += 1
+                yield (pending_section, None)
+                pending_section = None
+            current_entry_no += 1
+            new_word = _parse_entry(entry, custom)
+            new_word['section'] = current_section_no
+            new_word['number'] = current_entry_no
+            yield (None, new_word)
+
+    if pending_section is not None:
+        yield (pending_section, None)
+
+
 def open_text_list(word_file, custom=None):
     """
     Open a list in the format used by skritter/pleco.
@@ -35,74 +148,58 @@ def open_text_list(word_file, custom=None):
         entry_no the index of this word in word_list
     """
 
-    if not custom:
-        custom = TEXT_FILE_DEFAULT
-    else:
-        for k, v in TEXT_FILE_DEFAULT.items():
-            if k not in custom:
-                custom[k] = v
+    sections = []
+    words = []
+    for section, word in iter_text_list(word_file, custom):
+        if word is None:
+            sections.append(section)
+        else:
+            words.append(word)
+    return (sections, words)
 
-    raw_text = word_file.read().strip()
-    entries = [entry.strip() for entry in
-               raw_text.split(custom['entry_delimiter'])]
 
-    words = []
-    current_section_no = -1
-    sections = []
-    current_entry_no = -1
-    previous_line_section = False
+def _text_list_lines(sections, words, custom):
+    """ Yield the lines of a list file, see save_text_list. """
 
-    for entry in entries:
-        if entry == '' or entry.startswith(custom['comment_start']):
-            pass
-        elif entry.startswith(custom['sec_start']):  # section heading
-            current_section = entry[len(custom['sec_start']):]
-            current_section = current_section.split(custom['sec_delimiter'])
-            if previous_line_section:  # overwrite empty section
-                sections[-1] = current_section
+    current_section_no = -1
+    for word in words:
+        current_line = []
+        # add new section
+        if word['section'] != current_section_no:
+            if word['section'] < len(sections):
+                yield custom['sec_start'] + custom['sec_delimiter'].join(
+                    sections[word['section']])
             else:
-                current_section_no += 1
-                sections.append(current_section)
-            previous_line_section = True
-        else:                       # an entry
-            previous_line_section = False
-            current_entry_no += 1
-
-            attributes = entry.split(custom['attr_delimiter'])
-            new_word = {}
-            for (name, attribute) in zip(custom['attr_order'], attributes):
-                # special treatment for pleco files with simp[trad]
-                if name == 'simp[trad]':
-                    if '[' in attribute:
-                        if attribute.startswith('['):
-                            new_word['trad'] = attribute[1:-1]
-                        else:
-                            new_word['simp'] = attribute[:attribute.find('[')]
-                            new_word['trad'] =\
-                                    attribute[attribute.find('[') + 1:-1]
-                    else:
-                        new_word['simp'] = attribute
-                else:
-                    new_word[name] = attribute
+                yield ''
+            current_section_no = word['section']
 
-            new_word['section'] = current_section_no
-            new_word['number'] = current_entry_no
-            words.append(new_word)
+        # add word
+        for name in custom['attr_order']:
+            if name == 'simp[trad]':
+                simp = word['simp'] if 'simp' in word else ''
+                trad = word['trad'] if 'trad' in word else ''
+                current_line.append(simp + '[' + trad + ']')
+            else:
+                attr = word[name] if name in word else ''
+                current_line.append(attr)
 
-    return (sections, words)
+        yield custom['attr_delimiter'].join(current_line)
 
 
-def save_text_list(word_file, sections, words, custom=None):
+def save_text_list(word_file, sections, words, custom=None, batch_size=1000):
     """
     Save a list as a text file.
 
+    The lines are written in batches of batch_size lines, words can be any
+    iterable (e.g. a generator), so the whole file is never built in memory.
+
     Args:
         word_file (file object): a file object opened to read the file
         sections (list): a list of lists which contain the complete section
             name, e.g.
             [['Book 1', 'Chapter 1', 'Listing 1'],
             ['Book 1', 'Chapter 1', Listing 2']]
-        words (list): a list of dictionaries, reach representing a word
+        words (iterable): dictionaries, reach representing a word
             using the keys 'simp','trad','pinyin','definition','section_no',
             'entry_no' plus others. The default value for each key is ''.
             section_no is index of the section for this word in
@@ -110,45 +207,311 @@ def save_text_list(word_file, sections, words, custom=None):
             entry_no the index of this word in word_list
             custom (dict): used to specify the file format,
                 same as in open_text_list
+        batch_size (int): number of lines written at once
     """
 
-    if not custom:
-        custom = TEXT_FILE_DEFAULT
-    else:
-        for k, v in TEXT_FILE_DEFAULT.items():
-            if k not in custom:
-                custom[k] = v
+    custom = _text_list_format(custom)
+    delimiter = custom['entry_delimiter']
+    lines = _text_list_lines(sections, words, custom)
+    # no delimiter before the first line and after the last one
+    prefix = ''
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            break
+        word_file.write(prefix + delimiter.join(batch))
+        prefix = delimiter
 
-    output_lines = []
-    current_section_no = -1
-    for word in words:
-        current_line = []
-        # add new section
-        if word['section'] != current_section_no:
-            if word['section'] < len(sections):
-                output_lines.append(
-                    custom['sec_start'] + custom['sec_delimiter'].join(
-                        sections[word['section']]))
-            else:
-                output_lines.append('')
-            current_section_no = word['section']
 
-        # add word
-        for name in custom['attr_order']:
-            if name == 'simp[trad]':
-                simp = word['simp'] if 'simp' in word else ''
-                trad = word['trad'] if 'trad' in word else ''
-                current_line.append(simp + '[' + trad + ']')
+def _find_boundary(list_file, offset, delimiter, block_size=1 << 16):
+    """
+    Return the position after the first entry delimiter at or after offset.
+
+    Only delimiters which str.split would also use are considered, for a
+    delimiter like '||' in 'a|||b' that is the first one, not the second.
+    Returns None if there is no such delimiter.
+    """
+
+    back = len(delimiter) - 1
+    start = max(offset - back, 0)
+    list_file.seek(start)
+    data = list_file.read(block_size)
+    pos = offset - start
+    while True:
+        pos = data.find(delimiter, pos)
+        if pos == -1:
+            block = list_file.read(block_size)
+            if not block:
+                return None
+            pos = max(len(data) - back, 0)
+            data += block
+            continue
+        # a delimiter overlapping this one from the left would be used first
+        if data.find(delimiter, max(pos - back, 0), pos + back) == -1:
+            return start + pos + len(delimiter)
+        pos += 1
+
+
+def _text_list_chunks(path, delimiter, chunk_size):
+    """ Return (start, end) byte positions of chunks of whole entries. """
+
+    size = os.path.getsize(path)
+    delimiter = delimiter.encode('utf-8')
+    if '\r'.encode('utf-8') in delimiter:
+        # newlines are translated to '\n', this delimiter can't be found
+        return [(0, size)]
+    chunks = []
+    start = 0
+    with open(path, mode='rb') as list_file:
+        while start + chunk_size < size:
+            end = _find_boundary(list_file, start + chunk_size, delimiter)
+            if end is None:
+                break
+            chunks.append((start, end))
+            start = end
+    chunks.append((start, size))
+    return chunks
+
+
+_VALUE_SEPARATOR = '\x00'
+
+
+def _parse_text_list_chunk(job):
+    """
+    Parse the entries between two byte positions of a list file.
+
+    The words are returned in a compact form which is much faster to send
+    back from a worker process than a list of dictionaries.
+
+    Returns:
+        (sections, patterns, runs, values, word_sections,
+        starts_with_section, ends_with_section): runs is a list of
+            (pattern number, number of words) for consecutive words with
+            the same keys, patterns[pattern number], the values of all
+            words are joined by _VALUE_SEPARATOR (or a list, if the text
+            contains it) and word_sections has the section of each word
+            within the chunk, -1 for words before the first section
+            heading of the chunk
+    """
+
+    path, start, end, custom = job
+    with open(path, mode='rb') as list_file:
+        list_file.seek(start)
+        data = list_file.read(end - start)
+    # the same newline translation as for files opened in text mode
+    text = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    sections = []
+    patterns = {}
+    runs = []
+    values = []
+    word_sections = array('i')
+    first_is_section = last_is_section = None
+    for section, word in iter_text_list(text, custom):
+        last_is_section = word is None
+        if first_is_section is None:
+            first_is_section = last_is_section
+        if last_is_section:
+            sections.append(section)
+            continue
+        word_sections.append(word.pop('section'))
+        del word['number']  # the words of a chunk are numbered from 0
+        keys = tuple(word)
+        pattern_no = patterns.setdefault(keys, len(patterns))
+        if runs and runs[-1][0] == pattern_no:
+            runs[-1][1] += 1
+        else:
+            runs.append([pattern_no, 1])
+        values.extend(word.values())
+    if _VALUE_SEPARATOR.encode('utf-8') not in data:
+        values = _VALUE_SEPARATOR.join(values)
+    patterns = sorted(patterns, key=patterns.get)
+    return (sections, patterns, runs, values, word_sections,
+            bool(first_is_section), bool(last_is_section))
+
+
+def open_text_list_parallel(path, custom=None, processes=None,
+                            chunk_size=1 << 22, word_maker=None):
+    """
+    Open a large list file like open_text_list, using a process pool.
+
+    The file is split into chunks at entry delimiters, the chunks are
+    parsed in parallel and then put together, fixing the section and word
+    numbers. The result is the same as that of open_text_list. The workers
+    send back the values of the words, only the words themselves are
+    created in the calling process, with word_maker for the final word type
+    (e.g. ChWord), so there is no intermediate dictionary per word.
+
+    Args:
+        path (str): the path of the list file, utf-8
+        custom (dict): the file format, see open_text_list
+        processes (int): number of worker processes, None: one per cpu,
+            1: no process pool, the file is parsed like open_text_list
+        chunk_size (int): approximate number of bytes per chunk, for a
+            file with only one chunk no process pool is used either
+        word_maker (function): word_maker(names) returns a function
+            creating a word from the values of these attributes (passed as
+            positional arguments), names always ends with 'section' and
+            'number'. Default: the words are dictionaries.
+    Returns:
+        (sections, words): see open_text_list
+    """
+
+    custom = dict(_text_list_format(custom))
+    jobs = [(path, start, end, custom) for start, end
+            in _text_list_chunks(path, custom['entry_delimiter'], chunk_size)]
+    if processes == 1 or len(jobs) < 2:
+        with open(path, mode='r', encoding='utf-8') as list_file:
+            if word_maker is None:
+                return open_text_list(list_file, custom)
+            return _make_text_list_words(list_file, custom, word_maker)
+    with Pool(processes) as pool:
+        results = pool.imap(_parse_text_list_chunk, jobs, 1)
+        return _join_text_list_chunks(results, word_maker)
+
+
+def _make_text_list_words(list_file, custom, word_maker):
+    """ open_text_list with words created by word_maker. """
+
+    sections = []
+    words = []
+    makers = {}
+    for section, word in iter_text_list(list_file, custom):
+        if word is None:
+            sections.append(section)
+            continue
+        names = tuple(word)
+        if names not in makers:
+            makers[names] = word_maker(names)
+        words.append(makers[names](*word.values()))
+    return (sections, words)
+
+
+def _join_text_list_chunks(results, word_maker=None):
+    """ Put the results of _parse_text_list_chunk together, in order. """
+
+    sections = []
+    words = []
+    makers = {}
+    # the last section of the previous chunks has no words (yet)
+    empty_section = False
+    for (chunk_sections, patterns, runs, values, word_sections,
+         first_is_section, last_is_section) in results:
+        if empty_section and first_is_section:  # overwrite empty section
+            sections.pop()
+        offset = len(sections)
+        sections.extend(chunk_sections)
+        if isinstance(values, str):
+            values = values.split(_VALUE_SEPARATOR)
+        values = iter(values)
+        # -1: still in the last section of the previous chunks
+        word_sections = iter([section + offset if section > -1
+                              else offset - 1 for section in word_sections])
+        numbers = count(len(words))
+        # creating the words takes most of the time here, so they are
+        # created with map for each run of words with the same keys
+        for pattern_no, run_length in runs:
+            keys = patterns[pattern_no]
+            names = keys + ('section', 'number')
+            rows = islice(zip(*([values] * len(keys) +
+                                [word_sections, numbers])), run_length)
+            if word_maker is None:
+                words.extend(map(dict, map(zip, repeat(names), rows)))
             else:
-                attr = word[name] if name in word else ''
-                current_line.append(attr)
+                if names not in makers:
+                    makers[names] = word_maker(names)
+                words.extend(starmap(makers[names], rows))
+        if chunk_sections or runs:
+            empty_section = last_is_section
+    return (sections, words)
+
+
+CedictEntry = namedtuple('CedictEntry',
+                         ['trad', 'simp', 'pinyin', 'definitions', 'extra'])
+
+class _EmptyExtra(dict):
+    """ The read-only empty dict of all compact entries without extra. """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('the extra info of compact entries is read-only')
 
-        output_lines.append(custom['attr_delimiter'].join(current_line))
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
 
-    word_file.write(custom['entry_delimiter'].join(output_lines))
+    def __reduce__(self):
+        # pickled by name, so it is still one shared object after loading
+        return '_EMPTY_EXTRA'
 
 
-def open_cedict(cedict_file, key='trad'):
+_EMPTY_EXTRA = _EmptyExtra()
+
+
+def _parse_definitions(raw_definitions):
+    """ Split '/def1/def2/' into a tuple of definitions and the extra info. """
+
+    definitions = raw_definitions[1:-1].split('/')
+    extra = {}
+    for i, definition in enumerate(definitions):
+        if definition.startswith('Taiwan pr.'):
+            extra['tw'] = definition[11:].strip('[]')
+            definitions[i] = ''
+        if definition.startswith('CL:'):
+            extra['cl'] = definition[3:]
+            definitions[i] = ''
+    return (tuple([d for d in definitions if not d == '']), extra)
+
+
+def iter_cedict(cedict_file, keys=None, pinyin_prefix=None, predicate=None):
+    """
+    Read a cedict file entry by entry.
+
+    Only one line is kept in memory at a time. The filters are applied as
+    early as possible, the definitions are only parsed for lines passing
+    keys and pinyin_prefix.
+
+    Args:
+        cedict_file (file): The file object
+        keys (set): only yield entries whose traditional or simplified
+            form is in keys
+        pinyin_prefix (str): only yield entries whose pinyin starts with
+            this, ignoring case, e.g. 'zhong1 guo2'
+        predicate (function): only yield entries for which
+            predicate(entry) is True
+    Yields:
+        entry (CedictEntry): a named tuple (trad, simp, pinyin, definitions,
+            extra), pinyin, definitions and extra as described in
+            open_cedict
+    Raises:
+        ValueError: for lines which are not in the cedict format
+    """
+
+    if pinyin_prefix is not None:
+        pinyin_prefix = pinyin_prefix.lower()
+    for line_no, line in enumerate(cedict_file, 1):
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+
+        trad, _, rest = line.partition(' ')
+        simp, _, rest = rest.partition(' ')
+        pinyin_end = rest.find('] /')
+        if not rest.startswith('[') or pinyin_end == -1 or\
+                not rest.endswith('/'):
+            raise ValueError('line %d is not a cedict entry: %r'
+                             % (line_no, line))
+        if keys is not None and trad not in keys and simp not in keys:
+            continue
+        pinyin = rest[1:pinyin_end]
+        if pinyin_prefix is not None and\
+                not pinyin.lower().startswith(pinyin_prefix):
+            continue
+
+        definitions, extra = _parse_definitions(rest[pinyin_end + 2:])
+        entry = CedictEntry(trad, simp, pinyin, definitions, extra)
+        if predicate is None or predicate(entry):
+            yield entry
+
+
+def open_cedict(cedict_file, key='trad', compact=False, **filters):
     """
     Open a cedict file as a python dictionary.
 
@@ -156,6 +519,13 @@ def open_cedict(cedict_file, key='trad'):
         cedict_file (file): The file object
         key ('trad'/'simp'): The property which is used as a key in the
             python dictionary.
+        compact (bool/dict): Use less memory: equal strings and
+            definition tuples are stored only once, all entries without
+            extra info share one read-only empty mapping and the entries of
+            each key are stored in a tuple instead of a list. Pass the same
+            dict (e.g. {}) for several calls to also share the strings
+            between them, e.g. for a trad and a simp version.
+        filters: keys, pinyin_prefix or predicate, see iter_cedict
     Returns:
         cedict (dict): The dictionary has the following structure:
             { '囧': [
@@ -174,43 +544,74 @@ def open_cedict(cedict_file, key='trad'):
                 cl for a measure word
     """
     cedict = {}
-    line_pattern = re.compile("^(.*?)\s{1}(.*?)\s{1}(\[.*?\])\s{1}(\/.*\/)$")
-    for line in cedict_file:
-        line = line.strip()
-        if line[0] == '#':
-            continue
-
-        items = line_pattern.match(line)
-        items = items.groups()
-        trad = items[0]
-        simp = items[1]
-        pinyin = items[2][1:-1]
-        definitions = items[3][1:-1].split('/')
-
-        extra = {}
-        for i, definition in enumerate(definitions):
-            if definition.startswith('Taiwan pr.'):
-                extra['tw'] = definition[11:].strip('[]')
-                definitions[i] = ''
-            if definition.startswith('CL:'):
-                extra['cl'] = definition[3:]
-                definitions[i] = ''
-        definitions = tuple([d for d in definitions if not d == ''])
-
+    # an empty dict to share the strings with later calls is compact, too
+    if isinstance(compact, dict):
+        share = compact.setdefault
+        compact = True
+    elif compact:
+        share = {}.setdefault
+    for trad, simp, pinyin, definitions, extra in iter_cedict(cedict_file,
+                                                              **filters):
         if key == 'trad':
             char_key = trad
             simp_trad = simp
         else:
             char_key = simp
             simp_trad = trad
+        if compact:
+            char_key = share(char_key, char_key)
+            simp_trad = share(simp_trad, simp_trad)
+            pinyin = share(pinyin, pinyin)
+            definitions = share(definitions, tuple([share(d, d) for d
+                                                    in definitions]))
+            if extra:
+                extra = dict((k, share(v, v)) for k, v in extra.items())
+            else:
+                extra = _EMPTY_EXTRA
         entry = (simp_trad, pinyin, definitions, extra)
         if char_key in cedict:
             cedict[char_key].append(entry)
         else:
             cedict[char_key] = [entry]
+    if compact:
+        for char_key, entries in cedict.items():
+            cedict[char_key] = tuple(entries)
     return cedict
 
 
+def _parse_unihan_value(kvalue, value):
+    """ Convert the raw value of a unihan field. """
+
+    if kvalue == 'kMandarin':
+        return value.split(',')
+    elif kvalue == 'kHanyuPinyin':
+        return [y for x in value.split(' ')
+                for y in x[x.find(':') + 1:].split(',')]
+    return value
+
+
+def iter_unihan(unihan_file, kvalues):
+    """
+    Yield (code point, kvalue, value) for the requested fields of a file.
+
+    Args:
+        unihan_file (file object): the unihan file
+        kvalues (iterable): the fields that should be extracted
+    """
+
+    kvalues = frozenset(kvalues)
+    for line in unihan_file:
+        if not line.startswith('U+'):  # comments and empty lines
+            continue
+        items = line.split('\t', 2)
+        if len(items) != 3:
+            continue
+        kvalue = items[1].strip()
+        if kvalue in kvalues:
+            yield (int(items[0][2:], 16), kvalue,
+                   _parse_unihan_value(kvalue, items[2].strip()))
+
+
 def open_unihan(unihan_file, kvalues):
     """
     Open one unihan file and read the indicated values for all characters.
@@ -226,32 +627,274 @@ def open_unihan(unihan_file, kvalues):
     """
 
     unihan_dic = {}
-
-    for word_line in unihan_file:
-        word_line = word_line.strip()
-        items = word_line.split('\t')
-        if len(items) == 3:
-            kvalue = items[1].strip()
+    for code_point, kvalue, content in iter_unihan(unihan_file, kvalues):
+        hanzi = chr(code_point)
+        if hanzi in unihan_dic:
+            unihan_dic[hanzi][kvalue] = content
         else:
-            continue
+            unihan_dic[hanzi] = {kvalue: content}
+    return unihan_dic
 
-        if kvalue in kvalues:
-            hanzi = chr(int(items[0][2:], 16))
 
-            if kvalue == 'kMandarin':
-                content = items[2].split(',')
-            elif kvalue == 'kHanyuPinyin':
-                content = [y for x in items[2].split(' ')
-                           for y in x[x.find(':') + 1:].split(',')]
-            else:
-                content = items[2].strip()
+class UnihanColumns(object):
+    """
+    Unihan values stored by field: one dict code point -> value per kvalue.
+
+    This is much smaller than a dict per character. Use open_unihan_dir to
+    create it.
+
+    Args:
+        columns (dict): kvalue -> {code point: value}
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def column(self, kvalue):
+        """ Return the dict code point -> value for one field. """
+
+        return self.columns[kvalue]
+
+    def get(self, hanzi, kvalue, default=None):
+        """ Return the value of one field for a character. """
+
+        return self.columns[kvalue].get(ord(hanzi), default)
+
+    def __getitem__(self, hanzi):
+        """ Return {kvalue: value} for a character like open_unihan. """
+
+        code_point = ord(hanzi)
+        values = dict((kvalue, column[code_point]) for kvalue, column
+                      in self.columns.items() if code_point in column)
+        if not values:
+            raise KeyError(hanzi)
+        return values
+
+    def __contains__(self, hanzi):
+        code_point = ord(hanzi)
+        return any(code_point in column for column in self.columns.values())
+
+    def legacy(self):
+        """ Return all values in the dict of dicts format of open_unihan. """
+
+        unihan_dic = {}
+        for kvalue, column in self.columns.items():
+            for code_point, content in column.items():
+                hanzi = chr(code_point)
+                if hanzi in unihan_dic:
+                    unihan_dic[hanzi][kvalue] = content
+                else:
+                    unihan_dic[hanzi] = {kvalue: content}
+        return unihan_dic
+
+
+def _unihan_file_columns(job):
+    """ Read one unihan file into columns, used by open_unihan_dir. """
+
+    path, kvalues = job
+    columns = dict((kvalue, {}) for kvalue in kvalues)
+    with open(path, mode='r', encoding='utf-8') as unihan_file:
+        for code_point, kvalue, content in iter_unihan(unihan_file, kvalues):
+            columns[kvalue][code_point] = content
+    return columns
+
+
+def open_unihan_dir(path, kvalues, processes=None):
+    """
+    Read the requested values from all unihan files in a directory.
+
+    The files (*.txt, e.g. Unihan_Readings.txt) are parsed in parallel.
+
+    Args:
+        path (str): the directory, e.g. the unpacked Unihan.zip
+        kvalues (list): the fields that should be extracted
+        processes (int): number of worker processes, None: one per cpu,
+            1: no process pool
+    Returns:
+        unihan (UnihanColumns): the values, unihan.legacy() returns the
+            same as open_unihan
+    """
+
+    kvalues = frozenset(kvalues)
+    jobs = [(file_path, kvalues) for file_path
+            in sorted(glob.glob(os.path.join(path, '*.txt')))]
+    if processes == 1 or len(jobs) < 2:
+        results = map(_unihan_file_columns, jobs)
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(_unihan_file_columns, jobs, 1)
+    columns = dict((kvalue, {}) for kvalue in kvalues)
+    for file_columns in results:
+        for kvalue, column in file_columns.items():
+            columns[kvalue].update(column)
+    return UnihanColumns(columns)
+
+class _LineStore(object):
+    """
+    Sentences by id in memory, as utf-8 in one bytearray.
+
+    A dict of lines needs more than 100 bytes per sentence on top of the
+    text, here it is 20 bytes: the id and the start and end of the line.
+    """
+
+    def __init__(self):
+        self._ids = array('I')
+        self._starts = array('Q')
+        self._ends = array('Q')
+        self._data = bytearray()
+        self._sorted = True
+
+    def __setitem__(self, sentence_id, line):
+        if self._ids and sentence_id <= self._ids[-1]:
+            self._sorted = False
+        self._ids.append(sentence_id)
+        self._starts.append(len(self._data))
+        self._data += line.encode('utf-8')
+        self._ends.append(len(self._data))
+
+    def flush(self):
+        if self._sorted:
+            return
+        # stable, so the last line of an id is still the last one
+        order = sorted(range(len(self._ids)), key=self._ids.__getitem__)
+        self._ids = array('I', [self._ids[i] for i in order])
+        self._starts = array('Q', [self._starts[i] for i in order])
+        self._ends = array('Q', [self._ends[i] for i in order])
+        self._sorted = True
+
+    def __getitem__(self, sentence_id):
+        pos = bisect_right(self._ids, sentence_id) - 1
+        if pos < 0 or self._ids[pos] != sentence_id:
+            raise KeyError(sentence_id)
+        return self._data[self._starts[pos]:self._ends[pos]].decode('utf-8')
+
+    def close(self):
+        pass
+
+
+class _SpillStore(object):
+    """ Sentences by id in a temporary sqlite file instead of a dict. """
+
+    def __init__(self, spill_dir):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite',
+                                             dir=spill_dir)
+        os.close(handle)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute('CREATE TABLE sentences '
+                         '(id INTEGER PRIMARY KEY, line TEXT)')
+        self._pending = []
 
-            if hanzi in unihan_dic:
-                unihan_dic[hanzi][kvalue] = content
+    def __setitem__(self, sentence_id, line):
+        self._pending.append((sentence_id, line))
+        if len(self._pending) >= 10000:
+            self.flush()
+
+    def flush(self):
+        self._db.executemany('INSERT OR REPLACE INTO sentences VALUES (?, ?)',
+                             self._pending)
+        self._pending = []
+
+    def __getitem__(self, sentence_id):
+        row = self._db.execute('SELECT line FROM sentences WHERE id = ?',
+                               (sentence_id,)).fetchone()
+        return row[0]
+
+    def close(self):
+        self._db.close()
+        os.remove(self.path)
+
+
+def _read_link_lines(links):
+    """ Yield (id1, id2) as integers, reading the file in big blocks. """
+
+    for lines in iter(lambda: links.readlines(1 << 20), []):
+        for line in lines:
+            id1, _, id2 = line.partition('\t')
+            if id2:
+                yield (int(id1), int(id2))
+
+
+def iter_tatoeba(sentences,
+                 links,
+                 primary_lang='cmn',
+                 secondary_langs=None,
+                 sorted_links=False,
+                 spill_dir=None):
+    """
+    Yield grouped sentences from the tatoeba files one group at a time.
+
+    The sentences file is read once. Only sentences in the requested
+    languages are kept, as utf-8 in one buffer (see _LineStore), the
+    language of every sentence id is stored in one byte. With sorted_links,
+    groups are yielded as soon as all links of a primary sentence are read,
+    otherwise after reading all links.
+
+    Args:
+        sentences, links, primary_lang, secondary_langs: see open_tatoeba
+        sorted_links (bool): the links file is sorted by the first id,
+            which is the case for the official links.csv
+        spill_dir (str): keep the sentences in a temporary sqlite file in
+            this directory instead of in memory
+    Yields:
+        item (list): one group, see open_tatoeba
+    """
+
+    if not secondary_langs:
+        secondary_langs = ['eng']
+    # 1: primary language, 2...: secondary languages, 0: anything else
+    lang_codes = {primary_lang: 1}
+    for i, lang in enumerate(secondary_langs):
+        lang_codes[lang] = i + 2
+    sentence_langs = bytearray()
+    store = _SpillStore(spill_dir) if spill_dir else _LineStore()
+
+    try:
+        for line in sentences:
+            line = line.strip()
+            items = line.split('\t', 2)
+            code = lang_codes.get(items[1]) if len(items) > 1 else None
+            if code:
+                sentence_id = int(items[0])
+                if sentence_id >= len(sentence_langs):
+                    sentence_langs.extend(
+                        bytes(sentence_id + 1 - len(sentence_langs)))
+                sentence_langs[sentence_id] = code
+                store[sentence_id] = line
+        store.flush()
+
+        id_count = len(sentence_langs)
+        boilerplate = ['' for i in range(len(secondary_langs) + 1)]
+
+        def group(id1, id2s):
+            item = list(boilerplate)
+            item[0] = store[id1].split('\t')
+            for id2 in id2s:
+                item[sentence_langs[id2] - 1] = store[id2].split('\t')
+            return item
+
+        primary_lang_index = {}
+        current_id = None
+        current_id2s = []
+        for id1, id2 in _read_link_lines(links):
+            if id1 >= id_count or id2 >= id_count or\
+                    sentence_langs[id1] != 1 or sentence_langs[id2] < 2:
+                continue
+            if not sorted_links:
+                primary_lang_index.setdefault(id1, array('l')).append(id2)
+            elif id1 == current_id:
+                current_id2s.append(id2)
             else:
-                unihan_dic[hanzi] = {kvalue: content}
+                if current_id is not None:
+                    yield group(current_id, current_id2s)
+                current_id = id1
+                current_id2s = [id2]
+        if current_id is not None:
+            yield group(current_id, current_id2s)
+        for id1, id2s in primary_lang_index.items():
+            yield group(id1, id2s)
+    finally:
+        store.close()
 
-    return unihan_dic
 
 def open_tatoeba(sentences=None,
                  links=None,
@@ -277,72 +920,134 @@ def open_tatoeba(sentences=None,
             ((2nd sent. in prim. lang), (...), (...))
             ...
             ]
+            Each sentence is the list of the fields of its line, the slot of
+            a secondary language without translation is ''. Use
+            iter_tatoeba for big files.
     """
 
-    if not secondary_langs:
-        secondary_langs = ['eng']
-    all_langs = {primary_lang: set()}
-    for lang in secondary_langs:
-        all_langs[lang] = set()
+    return list(iter_tatoeba(sentences, links, primary_lang, secondary_langs))
 
-    # first run: get ids of all sentences in relevant languages
-    for line in sentences:
-        line = line.strip()
-        line = line.split('\t')
-        sentence_id = line[0]
-        sentence_lang = line[1]
-        if sentence_lang in all_langs:
-            all_langs[sentence_lang].add(sentence_id)
-
-    all_sec_lang_ids = set()
-    for lang in secondary_langs:
-        all_sec_lang_ids.update(all_langs[lang])
-
-    # get links between sentences
-    primary_lang_index = {}
-    secondary_lang_relevant = set()
-    for line in links:
-        line = line.strip()
-        line = line.split('\t')
-        id1 = line[0]
-        id2 = line[1]
-        if (id1 in primary_lang_index) and\
-        (id2 in all_sec_lang_ids):
-            primary_lang_index[id1].append(id2)
-            secondary_lang_relevant.add(id2)
-        else:
-            if (id1 in all_langs[primary_lang]) and\
-            (id2 in all_sec_lang_ids):
-                primary_lang_index[id1] = [id2]
-                secondary_lang_relevant.add(id2)
 
-    relevant_sentences = {}
+class ParseCache(object):
+    """
+    Cache parsed cedict/unihan files on disk.
 
-    # second run: get relevant sentences
-    sentences.seek(0)
-    for line in sentences:
-        line = line.strip()
-        line = line.split('\t')
-        sentence_id = line[0]
-        sentence_lang = line[1]
-        if (sentence_id in primary_lang_index) or\
-        (sentence_id in secondary_lang_relevant):
-            relevant_sentences[sentence_id] = line
-
-    result = []
-    lang_index = {}
-    for i, lang in enumerate(secondary_langs):
-        lang_index[lang] = i + 1
-
-    # group sentences and add them to result
-    boilerplate = ['' for i in range(len(secondary_langs) + 1)]
-    for id1, id2s in primary_lang_index.items():
-        item = copy.copy(boilerplate)
-        item[0] = relevant_sentences[id1]
-        for id2 in id2s:
-            sentence2 = relevant_sentences[id2]
-            lang2 = sentence2[1]
-            item[lang_index[lang2]] = sentence2
-        result.append(item)
-
-    return result
+    The parsed structure is pickled into cache_dir together with a
+    fingerprint of the source file (size, modification time and sha1 of
+    the content). As long as the source file is unchanged, it is loaded
+    from the cache instead of being parsed again.
+
+    Args:
+        cache_dir (str): directory for the cache files, created if
+            necessary, default: ~/.cache/pyjiong
+        check_hash (bool): if the size is the same but the modification
+            time isn't, compare the sha1 of the source file, so a file which
+            was only touched or copied is still loaded from the cache. If
+            False, such a file is parsed again.
+    Attributes:
+        hits (int): number of loads served from the cache
+        misses (int): number of loads which had to parse the source file
+    """
+
+    def __init__(self, cache_dir=None, check_hash=True):
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache',
+                                     'pyjiong')
+        self.cache_dir = cache_dir
+        self.check_hash = check_hash
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """ Return a dictionary with the hits and misses so far. """
+
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _cache_path(self, path, parser_name, options):
+        key = repr((os.path.abspath(path), parser_name, options))
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + '.pickle')
+
+    @staticmethod
+    def _file_hash(path):
+        sha1 = hashlib.sha1()
+        with open(path, mode='rb') as source:
+            for block in iter(lambda: source.read(1 << 20), b''):
+                sha1.update(block)
+        return sha1.hexdigest()
+
+    def _is_fresh(self, path, stat, fingerprint):
+        size, mtime, digest = fingerprint
+        if size != stat.st_size:
+            return False
+        if mtime == stat.st_mtime_ns:
+            return True
+        # hashing means reading the whole file, only do it if necessary
+        return (self.check_hash and digest is not None and
+                digest == self._file_hash(path))
+
+    def load(self, path, parser, parser_name, options, *args):
+        """
+        Return parser(source_file, *args) using the cache if possible.
+
+        Args:
+            path (str): the source file, read as utf-8 text
+            parser (function): the function parsing the file object
+            parser_name (str), options: together with path the key of the
+                cache file, options has to contain everything influencing
+                the result and have a stable repr()
+            args: passed on to parser
+        """
+
+        cache_path = self._cache_path(path, parser_name, options)
+        stat = os.stat(path)
+        try:
+            with open(cache_path, mode='rb') as cache_file:
+                fingerprint, result = pickle.load(cache_file)
+            fresh = self._is_fresh(path, stat, fingerprint)
+        except (pickle.UnpicklingError, AttributeError, ImportError,
+                ValueError, EOFError, OSError):
+            # missing, broken or written by an incompatible version
+            fresh = False
+        if fresh:
+            self.hits += 1
+            if fingerprint[1] != stat.st_mtime_ns:
+                # same content, store the new mtime to skip the hash next time
+                self._save(cache_path, (stat.st_size, stat.st_mtime_ns,
+                                        fingerprint[2]), result)
+            return result
+
+        self.misses += 1
+        with open(path, mode='r', encoding='utf-8') as source:
+            result = parser(source, *args)
+        fingerprint = (stat.st_size, stat.st_mtime_ns,
+                       self._file_hash(path) if self.check_hash else None)
+        self._save(cache_path, fingerprint, result)
+        return result
+
+    def _save(self, cache_path, fingerprint, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+        with open(temp_path, mode='wb') as cache_file:
+            pickle.dump((fingerprint, result), cache_file,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+
+    def open_cedict(self, path, key='trad', keys=None, pinyin_prefix=None):
+        """ Cached open_cedict for the file at path, see open_cedict. """
+
+        options = (key, sorted(keys) if keys is not None else None,
+                   pinyin_prefix)
+        return self.load(path, self._parse_cedict, 'cedict', options,
+                         key, keys, pinyin_prefix)
+
+    @staticmethod
+    def _parse_cedict(cedict_file, key, keys, pinyin_prefix):
+        return open_cedict(cedict_file, key, keys=keys,
+                           pinyin_prefix=pinyin_prefix)
+
+    def open_unihan(self, path, kvalues):
+        """ Cached open_unihan for the file at path, see open_unihan. """
+
+        return self.load(path, open_unihan, 'unihan', sorted(kvalues),
+                         kvalues)
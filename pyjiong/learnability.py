@@ -0,0 +1,145 @@
+import heapq
+from itertools import islice
+from multiprocessing import Pool
+from pyjiong.tools import only_hanzi
+
+
+def known_units(chlist, attribute='simp', characters=False):
+    """
+    Return the set of known words (or characters) of a ChList.
+
+    Args:
+        chlist (ChList): the words the learner knows
+        attribute (string): the attribute with the hanzi, 'simp' or 'trad'
+        characters (bool): return the characters instead of the words
+    """
+
+    return frozenset(only_hanzi(unit) for unit
+                     in chlist.get_index(attribute, characters)) - set([''])
+
+
+def sentence_units(sentence, segmenter=None):
+    """ Return the hanzi words (segmenter) or characters of a sentence. """
+
+    if segmenter is None:
+        return list(only_hanzi(sentence))
+    return [word for word in (only_hanzi(w) for w
+                              in segmenter.segment(sentence)) if word]
+
+
+def score_sentence(sentence, known, segmenter=None):
+    """
+    Score a sentence by how many of its words are known.
+
+    Args:
+        sentence (str): the sentence
+        known (set): the known words, or characters without segmenter,
+            e.g. from known_units
+        segmenter (Segmenter): split the sentence into words, without it
+            every character is a unit
+    Returns:
+        (known fraction, unknown units): e.g. (0.67, ['囧']) for
+            '我很囧。' if 我 and 很 are known, everything which isn't hanzi
+            is ignored. The fraction is 0 for sentences without hanzi.
+    """
+
+    units = sentence_units(sentence, segmenter)
+    if not units:
+        return (0.0, [])
+    unknown = [unit for unit in units if unit not in known]
+    return (1.0 - len(unknown) / len(units), unknown)
+
+
+def _rank_chunk(chunk, known, segmenter, k, targets):
+    """
+    Return target -> list of (score, sentence_id, sentence) for one chunk.
+
+    Only the best k i+1 sentences per target word are kept, using a heap.
+    The score is (known fraction, -sentence length), higher is better.
+    """
+
+    heaps = {}
+    for sentence_id, sentence in chunk:
+        fraction, unknown = score_sentence(sentence, known, segmenter)
+        if len(set(unknown)) != 1:
+            continue
+        target = unknown[0]
+        if targets is not None and target not in targets:
+            continue
+        item = ((fraction, -len(sentence)), sentence_id, sentence)
+        heap = heaps.setdefault(target, [])
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return heaps
+
+_worker_args = None
+
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+
+def _rank_chunk_in_worker(chunk):
+    return _rank_chunk(chunk, *_worker_args)
+
+
+def rank_sentences(groups, known, k=5, segmenter=None, targets=None,
+                   processes=1, chunk_size=10000):
+    """
+    Find the best i+1 sentences for each unknown word.
+
+    An i+1 sentence contains exactly one unknown word (or character), the
+    target. For each target, the k sentences with the highest fraction of
+    known words are kept, shorter sentences first for equal fractions.
+    Sentences are processed in chunks, each chunk only returns its best k
+    per target, so the scores of all sentences are never held in memory.
+
+    Args:
+        groups (iterable): output of open_tatoeba/iter_tatoeba, the primary
+            sentence of each group is used
+        known (set): known words or characters, e.g. from known_units. It
+            should contain the same kind of units the sentences are split
+            into: words with segmenter, characters without
+        k (int): number of sentences per target
+        segmenter (Segmenter): optional, see score_sentence
+        targets (set): only look for these unknown words, None: all
+        processes (int): score the chunks in a pool of this many worker
+            processes, None: one per cpu, 1: no pool
+        chunk_size (int): number of sentences per chunk
+    Returns:
+        ranking (dict): target -> list of tuples (known fraction,
+            sentence id, sentence), best first
+    """
+
+    sentences = ((int(item[0][0]), item[0][2]) for item in groups)
+    chunks = iter(lambda: list(islice(sentences, chunk_size)), [])
+    args = (frozenset(known), segmenter, k,
+            frozenset(targets) if targets is not None else None)
+    if processes == 1:
+        results = (_rank_chunk(chunk, *args) for chunk in chunks)
+        return _merge(results, k)
+    with Pool(processes, initializer=_init_worker, initargs=args) as pool:
+        return _merge(pool.imap_unordered(_rank_chunk_in_worker, chunks), k)
+
+
+def _merge(results, k):
+    """ Merge the heaps of all chunks, keeping the best k per target. """
+
+    heaps = {}
+    for chunk_heaps in results:
+        for target, items in chunk_heaps.items():
+            heap = heaps.setdefault(target, [])
+            for item in items:
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+    ranking = {}
+    for target, heap in heaps.items():
+        ranking[target] = [(score[0], sentence_id, sentence) for
+                           score, sentence_id, sentence
+                           in sorted(heap, reverse=True)]
+    return ranking
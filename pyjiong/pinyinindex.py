@@ -0,0 +1,141 @@
+from array import array
+from pyjiong.tools import (PinyinSimilarity, pinyin_encode, pinyin_segment,
+                           pinyin_mark_to_num, PINYIN_TONE_MASK)
+try:
+    import numpy
+except ImportError:  # numpy is optional, searching just gets slower
+    numpy = None
+
+_ALL_BITS = 0xFFFF
+_TONELESS = _ALL_BITS ^ PINYIN_TONE_MASK
+
+
+class PinyinIndex(object):
+    """
+    Search a dictionary by pinyin using integer codes of the syllables.
+
+    The pinyin of all entries is encoded with pinyin_encode once and kept in
+    one flat array, the entries are grouped by their number of syllables.
+    If numpy is installed, searches are vectorized mask operations over these
+    arrays, otherwise plain python loops over the same arrays.
+
+    Args:
+        cedict (dict): the output of open_cedict
+    """
+
+    def __init__(self, cedict):
+        # (key, entry) for each entry, the position in this list is the
+        # entry number used in the arrays
+        self.entries = []
+        codes = array('H')
+        # number of syllables -> entry numbers / start of their codes
+        numbers = {}
+        starts = {}
+        for key, key_entries in cedict.items():
+            for entry in key_entries:
+                entry_codes = [pinyin_encode(s) for s in entry[1].split()]
+                if 0 in entry_codes:  # invalid syllables can't be found
+                    continue
+                length = len(entry_codes)
+                if length not in numbers:
+                    numbers[length] = array('q')
+                    starts[length] = array('q')
+                numbers[length].append(len(self.entries))
+                starts[length].append(len(codes))
+                codes.extend(entry_codes)
+                self.entries.append((key, entry))
+
+        if numpy is not None:
+            codes = numpy.frombuffer(codes, dtype=numpy.uint16)
+            for length in numbers:
+                numbers[length] = numpy.frombuffer(numbers[length],
+                                                   dtype=numpy.int64)
+                starts[length] = numpy.frombuffer(starts[length],
+                                                  dtype=numpy.int64)
+        self._codes = codes
+        self._numbers = numbers
+        self._starts = starts
+        self._similarity = None
+
+    def _match(self, allowed, mask):
+        """
+        Return the numbers of all entries matching the allowed codes.
+
+        Args:
+            allowed (list): a tuple of allowed codes for each syllable
+            mask (int): only these bits of the codes are compared
+        """
+
+        length = len(allowed)
+        if length not in self._numbers:
+            return []
+        numbers = self._numbers[length]
+        starts = self._starts[length]
+
+        if numpy is not None:
+            keep = numpy.ones(len(starts), dtype=bool)
+            for pos, codes in enumerate(allowed):
+                column = self._codes[starts + pos] & mask
+                if len(codes) == 1:
+                    keep &= column == codes[0]
+                else:
+                    keep &= numpy.isin(column, codes)
+            return numbers[keep].tolist()
+
+        all_codes = self._codes
+        allowed = [frozenset(codes) for codes in allowed]
+        result = []
+        for start, number in zip(starts, numbers):
+            for pos, codes in enumerate(allowed):
+                if all_codes[start + pos] & mask not in codes:
+                    break
+            else:
+                result.append(number)
+        return result
+
+    def find(self, pinyin, tones=True):
+        """
+        Return all entries with exactly this pinyin.
+
+        Args:
+            pinyin (str): with tone numbers, tone marks or without tones,
+                spaces between syllables are optional
+            tones (bool): False to ignore the tones
+        Returns:
+            entries (list): tuples (key, entry), key and entry as in the
+                output of open_cedict
+        """
+
+        codes = [pinyin_encode(s) for s in pinyin_segment(pinyin)]
+        mask = _ALL_BITS if tones else _TONELESS
+        return [self.entries[number] for number
+                in self._match([(code & mask,) for code in codes], mask)]
+
+    def find_similar(self, pinyin, similarity=None):
+        """
+        Return all entries with similar pinyin.
+
+        Args:
+            pinyin (str): see find
+            similarity (PinyinSimilarity): defines which syllables are
+                similar, e.g. PinyinSimilarity([1, 0, 3]) for entries with
+                similar initials, the same finals and any tone. Default:
+                PinyinSimilarity()
+        Returns:
+            entries (list): see find
+        """
+
+        if similarity is None:
+            if self._similarity is None:
+                self._similarity = PinyinSimilarity()
+            similarity = self._similarity
+        allowed = []
+        for syllable in pinyin_segment(pinyin):
+            if not pinyin_encode(syllable):
+                return []
+            if not syllable[-1].isdigit():
+                syllable = pinyin_mark_to_num(syllable)
+            allowed.append(tuple(pinyin_encode(s) for s
+                                 in similarity.similar_syllables(syllable)))
+        return [self.entries[number] for number
+                in self._match(allowed, _ALL_BITS)]
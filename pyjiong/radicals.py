@@ -0,0 +1,136 @@
+import pickle
+from array import array
+from bisect import bisect_left, bisect_right
+
+# sort key part for characters without stroke count
+UNKNOWN_STROKES = 999
+
+
+def _unihan_values(unihan, kvalue):
+    """
+    Yield (character, value) for one field.
+
+    Args:
+        unihan: the output of open_unihan or open_unihan_dir
+    """
+
+    if hasattr(unihan, 'columns'):  # UnihanColumns
+        for code_point, value in unihan.columns.get(kvalue, {}).items():
+            yield (chr(code_point), value)
+    else:
+        for hanzi, values in unihan.items():
+            if kvalue in values:
+                yield (hanzi, values[kvalue])
+
+
+def parse_rs_unicode(value):
+    """
+    Return a list of tuples (radical, residual strokes) for kRSUnicode.
+
+    The marks for simplified radicals (e.g. 120'.3) are ignored.
+    e.g. parse_rs_unicode("9.5 120'.3") -> [(9, 5), (120, 3)]
+    """
+
+    result = []
+    for item in value.split():
+        radical, _, residual = item.partition('.')
+        result.append((int(radical.rstrip("'")), int(residual)))
+    return result
+
+
+class RadicalStrokeIndex(object):
+    """
+    Find characters by radical and stroke count.
+
+    Built once from unihan (kRSUnicode and kTotalStrokes), then all queries
+    return precomputed lists or slices of sorted arrays, the time only
+    depends on the size of the result. The index can be pickled, see save
+    and load.
+
+    Args:
+        unihan: the output of open_unihan or open_unihan_dir with the
+            fields kRSUnicode and kTotalStrokes
+    """
+
+    def __init__(self, unihan):
+        # radical -> residual strokes -> characters, sorted by code point
+        self.radicals = {}
+        for hanzi, value in _unihan_values(unihan, 'kRSUnicode'):
+            for radical, residual in set(parse_rs_unicode(value)):
+                self.radicals.setdefault(radical, {}).setdefault(
+                    residual, []).append(hanzi)
+        for residuals in self.radicals.values():
+            for chars in residuals.values():
+                chars.sort()
+
+        # the first kTotalStrokes value is the one for simplified chinese
+        self.strokes = {}
+        for hanzi, value in _unihan_values(unihan, 'kTotalStrokes'):
+            self.strokes[hanzi] = int(value.split()[0])
+        by_strokes = sorted((count, hanzi) for hanzi, count
+                            in self.strokes.items())
+        self._sorted_strokes = array('H', [count for count, _ in by_strokes])
+        self._sorted_chars = ''.join(hanzi for _, hanzi in by_strokes)
+
+    def lookup(self, radical, residual=None):
+        """
+        Return the characters with a radical.
+
+        The characters are sorted by residual strokes, then code point.
+
+        Args:
+            radical (int): the Kangxi radical number, 1-214
+            residual (int): only characters with this number of strokes
+                besides the radical, None: all
+        """
+
+        residuals = self.radicals.get(radical, {})
+        if residual is not None:
+            return list(residuals.get(residual, ()))
+        return [hanzi for count in sorted(residuals)
+                for hanzi in residuals[count]]
+
+    def by_strokes(self, minimum, maximum=None):
+        """
+        Return the characters with minimum to maximum total strokes.
+
+        The characters are sorted by stroke count, then code point.
+        """
+
+        if maximum is None:
+            maximum = minimum
+        start = bisect_left(self._sorted_strokes, minimum)
+        end = bisect_right(self._sorted_strokes, maximum)
+        return list(self._sorted_chars[start:end])
+
+    def stroke_count(self, hanzi, default=None):
+        """ Return the total strokes of a character. """
+
+        return self.strokes.get(hanzi, default)
+
+    def sort_key(self, word):
+        """
+        Return a key to sort words by strokes, e.g. the simp of ChWords.
+
+        Words are sorted by the total strokes of all characters, then by the
+        strokes of each character, e.g.
+        test_list.words.sort(key=lambda w: index.sort_key(w.simp))
+        """
+
+        strokes = tuple(self.strokes.get(hanzi, UNKNOWN_STROKES)
+                        for hanzi in word)
+        return (sum(strokes), strokes, word)
+
+    def save(self, index_file):
+        """ Save the index to a file object opened for writing bytes. """
+
+        pickle.dump(self, index_file, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(index_file):
+        """ Load an index saved with save. """
+
+        index = pickle.load(index_file)
+        if not isinstance(index, RadicalStrokeIndex):
+            raise ValueError('not a RadicalStrokeIndex')
+        return index
@@ -0,0 +1,136 @@
+import math
+from multiprocessing import Pool
+from pyjiong.tools import hanzi_spans
+from pyjiong.trie import HeadwordTrie
+
+
+def _frequency_table(frequencies):
+    """
+    Return a dict word -> count from one of the supported formats.
+
+    Args:
+        frequencies: a dict word -> count, a list of tuples (word, count)
+            like the output of char_frequency, or a ChList sorted from most
+            to least frequent (e.g. a frequency list), in which case the
+            count of the word at position n is 1 / (n + 1)
+    """
+
+    if hasattr(frequencies, 'words'):  # a ChList
+        table = {}
+        for number, word in enumerate(frequencies.words):
+            for form in (word.simp, word.trad):
+                if form and form not in table:
+                    table[form] = 1.0 / (number + 1)
+        return table
+    return dict(frequencies)
+
+
+class Segmenter(object):
+    """
+    Split Chinese text into words using a dictionary.
+
+    For each run of hanzi, all dictionary words starting at each position
+    form a graph of possible segmentations; the path with the highest
+    probability according to the word frequencies wins. Without frequencies
+    all words are equally likely, which favours segmentations with fewer
+    (i.e. longer) words. Characters which are not part of any word become
+    words of their own, everything which isn't hanzi is kept as it is.
+
+    Args:
+        words (iterable): the dictionary words, e.g. the keys of open_cedict
+        frequencies: optional word frequencies, see _frequency_table
+    """
+
+    def __init__(self, words, frequencies=None):
+        self.trie = HeadwordTrie(words)
+        table = _frequency_table(frequencies) if frequencies else {}
+        # words without frequency count as half as frequent as the rarest
+        self._default_count = min(table.values()) / 2.0 if table else 1.0
+        total = sum(table.values()) + self._default_count * len(self.trie)
+        self._log_total = math.log(total)
+        self._log_counts = dict((word, math.log(count)) for word, count
+                                in table.items() if count > 0)
+        self._log_default = math.log(self._default_count)
+
+    @classmethod
+    def from_cedict(cls, cedict, frequencies=None):
+        """ Create a segmenter with the trad and simp words of open_cedict. """
+
+        words = set(cedict)
+        for entries in cedict.values():
+            words.update(entry[0] for entry in entries)
+        return cls(words, frequencies)
+
+    def _segment_hanzi(self, run):
+        """ Return the best segmentation of a run of hanzi. """
+
+        log_counts = self._log_counts
+        log_default = self._log_default
+        log_total = self._log_total
+        prefixes = self.trie.prefixes
+        length = len(run)
+        # best[i]: (log probability of run[i:], end of the first word)
+        best = [(0.0, length)] * (length + 1)
+        for pos in range(length - 1, -1, -1):
+            candidates = []
+            for word in prefixes(run, pos) or [run[pos]]:
+                word_end = pos + len(word)
+                candidates.append((log_counts.get(word, log_default) -
+                                   log_total + best[word_end][0], word_end))
+            best[pos] = max(candidates)
+        result = []
+        pos = 0
+        while pos < length:
+            word_end = best[pos][1]
+            result.append(run[pos:word_end])
+            pos = word_end
+        return result
+
+    def segment(self, text):
+        """
+        Return a list of the words in text.
+
+        e.g. segment('我是中國人!') -> ['我', '是', '中國人', '!']
+        """
+
+        result = []
+        pos = 0
+        for start, end in hanzi_spans(text):
+            if start > pos:
+                result.append(text[pos:start])
+            result.extend(self._segment_hanzi(text[start:end]))
+            pos = end
+        if pos < len(text):
+            result.append(text[pos:])
+        return result
+
+    def segment_many(self, texts, processes=1, chunksize=64):
+        """
+        Yield segment(text) for each string in texts, in order.
+
+        Args:
+            texts (iterable): e.g. a list of sentences or a file
+            processes (int): number of worker processes, each gets a copy
+                of the segmenter once. None: one per cpu, 1: no pool
+            chunksize (int): number of texts sent to a worker at once
+        """
+
+        if processes == 1:
+            for text in texts:
+                yield self.segment(text)
+            return
+        with Pool(processes, initializer=_init_worker,
+                  initargs=(self,)) as pool:
+            for words in pool.imap(_segment_in_worker, texts, chunksize):
+                yield words
+
+_worker_segmenter = None
+
+
+def _init_worker(segmenter):
+    global _worker_segmenter
+    _worker_segmenter = segmenter
+
+
+def _segment_in_worker(text):
+    return _worker_segmenter.segment(text)
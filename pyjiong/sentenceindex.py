@@ -0,0 +1,162 @@
+import heapq
+import pickle
+from array import array
+from bisect import insort
+from itertools import accumulate
+from pyjiong.tools import only_hanzi
+
+
+def _encode(ids):
+    """ Return sorted ids as array of differences to the previous id. """
+
+    deltas = array('I')
+    previous = 0
+    for sentence_id in ids:
+        deltas.append(sentence_id - previous)
+        previous = sentence_id
+    return deltas
+
+
+class SentenceIndex(object):
+    """
+    Find example sentences containing characters or words.
+
+    For each character (and with a Segmenter, each dictionary word) the index
+    keeps the sorted ids of all sentences containing it, stored as differences
+    to the previous id in an array. Sentences can be added at any time, e.g.
+    the new sentences of a new tatoeba dump, without rebuilding the index.
+    Words are always matched as substrings of the sentences, whether they are
+    indexed or found by their characters.
+
+    Args:
+        segmenter (Segmenter): optional, also index every word of its
+            dictionary contained in a sentence (not only the words of its
+            segmentation), which makes finding these words faster.
+    """
+
+    def __init__(self, segmenter=None):
+        self.segmenter = segmenter
+        self.sentences = {}  # id -> sentence
+        self._postings = {}  # term -> array of id differences
+        self._last_ids = {}  # term -> highest id in its postings
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def _terms(self, sentence):
+        terms = set(only_hanzi(sentence))
+        if self.segmenter:
+            prefixes = self.segmenter.trie.prefixes
+            for pos in range(len(sentence)):
+                terms.update(word for word in prefixes(sentence, pos)
+                             if len(word) > 1 and only_hanzi(word) == word)
+        return terms
+
+    def add(self, sentence_id, sentence):
+        """
+        Add one sentence, unless a sentence with this id is in the index.
+
+        Returns:
+            True if the sentence was added
+        """
+
+        if sentence_id in self.sentences:
+            return False
+        self.sentences[sentence_id] = sentence
+        for term in self._terms(sentence):
+            last_id = self._last_ids.get(term)
+            if last_id is None:
+                self._postings[term] = array('I', [sentence_id])
+                self._last_ids[term] = sentence_id
+            elif sentence_id > last_id:
+                self._postings[term].append(sentence_id - last_id)
+                self._last_ids[term] = sentence_id
+            else:  # an older id, rebuild the postings of this term
+                ids = list(accumulate(self._postings[term]))
+                insort(ids, sentence_id)
+                self._postings[term] = _encode(ids)
+        return True
+
+    def update(self, groups):
+        """
+        Add the primary sentences of tatoeba groups which are new.
+
+        Args:
+            groups (iterable): output of open_tatoeba or iter_tatoeba
+        Returns:
+            number of sentences added
+        """
+
+        added = 0
+        for item in groups:
+            sentence_id, _, sentence = item[0][:3]
+            if self.add(int(sentence_id), sentence):
+                added += 1
+        return added
+
+    def postings(self, term):
+        """ Return the sorted ids of all sentences containing term. """
+
+        return list(accumulate(self._postings.get(term, ())))
+
+    def _ids_for_word(self, word):
+        if word in self._postings or len(word) == 1:
+            return self.postings(word)
+        if self.segmenter and word in self.segmenter.trie:
+            return []  # would be indexed if any sentence contained it
+        # not indexed as a word: sentences containing all characters,
+        # then check for the whole word
+        ids = self._intersect([self.postings(char) for char in set(word)])
+        return [i for i in ids if word in self.sentences[i]]
+
+    @staticmethod
+    def _intersect(id_lists):
+        if not id_lists:
+            return []
+        id_lists = sorted(id_lists, key=len)
+        result = id_lists[0]
+        for ids in id_lists[1:]:
+            ids = set(ids)
+            result = [i for i in result if i in ids]
+        return result
+
+    def find(self, words, limit=None):
+        """
+        Return the sentences containing all words, shortest first.
+
+        Args:
+            words (list): words or characters, e.g. ['中国', '人']
+            limit (int): return at most this many sentences
+        Returns:
+            sentences (list): tuples (id, sentence)
+        """
+
+        if not words:
+            return []
+        id_lists = []
+        for word in sorted(set(words), key=len):
+            ids = self._ids_for_word(word)
+            if not ids:
+                return []
+            id_lists.append(ids)
+        found = [(len(self.sentences[i]), i)
+                 for i in self._intersect(id_lists)]
+        if limit is None:
+            found.sort()
+        else:
+            found = heapq.nsmallest(limit, found)
+        return [(i, self.sentences[i]) for _, i in found]
+
+    def save(self, index_file):
+        """ Save the index to a file object opened for writing bytes. """
+
+        pickle.dump(self, index_file, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(index_file):
+        """ Load an index saved with save. """
+
+        index = pickle.load(index_file)
+        if not isinstance(index, SentenceIndex):
+            raise ValueError('not a SentenceIndex')
+        return index
@@ -2,6 +2,7 @@
 #from __future__ import print_function
 import sys
 import re
+from array import array
 from collections import Counter
 
 TONE_MARKS = {
@@ -16,27 +17,140 @@ TONE_MARKS = {
      'u': ('ū','ú','ǔ','ù','u'),
      'U': ('Ū','Ú','Ǔ','Ù','U'),
      'ü': ('ǖ','ǘ','ǚ','ǜ','ü'),
-     'Ü': ('Ǖ','Ǘ','Ǚ','Ǜ','U')
+     'Ü': ('Ǖ','Ǘ','Ǚ','Ǜ','Ü')
      }
 
+# all code points of the Han script, Unicode 16.0
+HAN_RANGES = (
+    (0x2E80, 0x2E99),    # CJK RADICAL REPEAT..CJK RADICAL RAP
+    (0x2E9B, 0x2EF3),    # CJK RADICAL CHOKE..CJK RADICAL C-SIMPLIFIED TURTLE
+    (0x2F00, 0x2FD5),    # KANGXI RADICAL ONE..KANGXI RADICAL FLUTE
+    (0x3005, 0x3005),    # IDEOGRAPHIC ITERATION MARK
+    (0x3007, 0x3007),    # IDEOGRAPHIC NUMBER ZERO
+    (0x3021, 0x3029),    # HANGZHOU NUMERAL ONE..HANGZHOU NUMERAL NINE
+    (0x3038, 0x303B),    # HANGZHOU NUMERAL TEN..VERTICAL IDEOGRAPHIC ITERATION MARK
+    (0x3400, 0x4DBF),    # CJK Unified Ideographs Extension A
+    (0x4E00, 0x9FFF),    # CJK Unified Ideographs
+    (0xF900, 0xFA6D),    # CJK Compatibility Ideographs
+    (0xFA70, 0xFAD9),    # CJK Compatibility Ideographs
+    (0x20000, 0x2A6DF),  # CJK Unified Ideographs Extension B
+    (0x2A700, 0x2B739),  # CJK Unified Ideographs Extension C
+    (0x2B740, 0x2B81D),  # CJK Unified Ideographs Extension D
+    (0x2B820, 0x2CEA1),  # CJK Unified Ideographs Extension E
+    (0x2CEB0, 0x2EBE0),  # CJK Unified Ideographs Extension F
+    (0x2EBF0, 0x2EE5D),  # CJK Unified Ideographs Extension I
+    (0x2F800, 0x2FA1D),  # CJK Compatibility Ideographs Supplement
+    (0x30000, 0x3134A),  # CJK Unified Ideographs Extension G
+    (0x31350, 0x323AF))  # CJK Unified Ideographs Extension H
+
+_HAN_CLASS = ''.join('%s-%s' % (chr(start), chr(end))
+                     for start, end in HAN_RANGES)
+_HAN_PATTERN = re.compile('[%s]+' % _HAN_CLASS)
+_NON_HAN_PATTERN = re.compile('[^%s]+' % _HAN_CLASS)
+
+# all toneless pinyin syllables, ü written as ü
+PINYIN_SYLLABLES = tuple('''
+a ai an ang ao e ei en eng er o ou
+ba bai ban bang bao bei ben beng bi bian biao bie bin bing bo bu
+pa pai pan pang pao pei pen peng pi pian piao pie pin ping po pou pu
+ma mai man mang mao me mei men meng mi mian miao mie min ming miu mo mou mu
+fa fan fang fei fen feng fiao fo fou fu
+da dai dan dang dao de dei den deng di dia dian diao die ding diu dong dou
+du duan dui dun duo
+ta tai tan tang tao te tei teng ti tian tiao tie ting tong tou tu tuan tui
+tun tuo
+na nai nan nang nao ne nei nen neng ni nian niang niao nie nin ning niu
+nong nou nu nuan nun nuo nü nüe
+la lai lan lang lao le lei leng li lia lian liang liao lie lin ling liu lo
+long lou lu luan lun luo lü lüe
+ga gai gan gang gao ge gei gen geng gong gou gu gua guai guan guang gui gun
+guo
+ka kai kan kang kao ke kei ken keng kong kou ku kua kuai kuan kuang kui kun
+kuo
+ha hai han hang hao he hei hen heng hong hou hu hua huai huan huang hui hun
+huo
+ji jia jian jiang jiao jie jin jing jiong jiu ju juan jue jun
+qi qia qian qiang qiao qie qin qing qiong qiu qu quan que qun
+xi xia xian xiang xiao xie xin xing xiong xiu xu xuan xue xun
+zha zhai zhan zhang zhao zhe zhei zhen zheng zhi zhong zhou zhu zhua zhuai
+zhuan zhuang zhui zhun zhuo
+cha chai chan chang chao che chen cheng chi chong chou chu chua chuai chuan
+chuang chui chun chuo
+sha shai shan shang shao she shei shen sheng shi shou shu shua shuai shuan
+shuang shui shun shuo
+ra ran rang rao re ren reng ri rong rou ru rua ruan rui run ruo
+za zai zan zang zao ze zei zen zeng zi zong zou zu zuan zui zun zuo
+ca cai can cang cao ce cei cen ceng ci cong cou cu cuan cui cun cuo
+sa sai san sang sao se sen seng si song sou su suan sui sun suo
+ya yan yang yao ye yi yin ying yo yong you yu yuan yue yun
+wa wai wan wang wei wen weng wo wu
+m n ng hm hng r
+'''.split())
+
+_UMLAUT = {'v': 'ü', 'V': 'Ü', 'u:': 'ü', 'U:': 'Ü'}
+_NORMALIZE_PATTERN = re.compile('(?<=[nNlL])(v|V|u:|U:)')
+_NUM_PATTERN = re.compile('([a-zA-ZüÜ]{1,6})([1-5])')
+
+# the vowel that carries the tone mark, checked in this order
+_MARK_ORDER = (('a', 'a'), ('e', 'e'), ('o', 'o'), ('ui', 'i'), ('iu', 'u'),
+               ('u', 'u'), ('ü', 'ü'), ('i', 'i'))
+
+# tone mark character -> (plain character, tone)
+_MARK_CHARS = {mark: (plain, tone + 1)
+               for plain, marks in TONE_MARKS.items()
+               for tone, mark in enumerate(marks[:4])}
+
+
+def _mark_syllable(pin, tone):
+    """ Return pin with the tone mark for tone, None if there's no vowel. """
+
+    pin_low = pin.lower()
+    for mark_letter, replace_letter in _MARK_ORDER:
+        if mark_letter in pin_low:
+            pos = pin_low.find(replace_letter)
+            letter = pin[pos]
+            return pin[:pos] + TONE_MARKS[letter][tone - 1] + pin[pos + 1:]
+    return None
+
+
+def _build_tables():
+    """ Create the lookup tables numbered syllable <-> marked syllable. """
+
+    num_to_mark = {}
+    mark_to_num = {}
+    for syllable in PINYIN_SYLLABLES:
+        for variant in (syllable, syllable.capitalize(), syllable.upper()):
+            for tone in range(1, 6):
+                num = variant + str(tone)
+                mark = _mark_syllable(variant, tone)
+                if mark is None:
+                    continue
+                num_to_mark[num] = mark
+                if tone < 5:
+                    mark_to_num[mark] = num
+    return num_to_mark, mark_to_num
+
+_NUM_TO_MARK, _MARK_TO_NUM = _build_tables()
+_MARKED_PATTERN = re.compile(
+    '[a-zA-ZüÜ%s]+' % ''.join(sorted(_MARK_CHARS)))
+
+# every lower case spelling of a syllable (toneless, numbered, marked),
+# used to segment unspaced pinyin
+_SYLLABLE_FORMS = frozenset(
+    [s for s in PINYIN_SYLLABLES] +
+    [s + str(tone) for s in PINYIN_SYLLABLES for tone in range(1, 6)] +
+    [mark for mark in _MARK_TO_NUM if mark.islower()])
+_MAX_FORM_LEN = max(len(form) for form in _SYLLABLE_FORMS)
+# syllables starting with these need an apostrophe inside words
+_VOWEL_INITIALS = frozenset('aāáǎàoōóǒòeēéěè')
+_PINYIN_RUN_PATTERN = re.compile(
+    '[a-zA-ZüÜ1-5%s]+' % ''.join(sorted(_MARK_CHARS)))
+_SPLIT_CACHE = {}
+
 def pinyin_normalize(pinyin_num):
     """ Return the pinyin with u:/v converted to ü. """
 
-    pattern = re.compile('(n|N|l|L)(v|V|u:|U:)(e|E)?([1-5])?')
-    to_replace = (('v','ü'),('V','Ü'),('u:','ü'),('U:','Ü'))
-    colons_removed = 0
-    pinyin_num_copy = pinyin_num
-    for match in pattern.finditer(pinyin_num_copy):
-        s = match.group()
-        for this, with_this in to_replace:
-            s = s.replace(this,with_this)
-        cut_start = match.start() - colons_removed
-        cut_end = match.end() - colons_removed
-        pinyin_num = pinyin_num[:cut_start] + s + pinyin_num[cut_end:]
-        if ':' in match.group(2):
-            colons_removed += 1
-
-    return pinyin_num
+    return _NORMALIZE_PATTERN.sub(lambda m: _UMLAUT[m.group()], pinyin_num)
 
 def pinyin_split(pinyin_num):
     """ Return a tuple (inital, final, tone) for one syllable. """
@@ -65,8 +179,9 @@ def pinyin_split(pinyin_num):
     elif pinyin[0] in INITIALS:
         initial = pinyin[0]
         final = pinyin[1:]
-        if initial in set(('j', 'q', 'x')):
-            final = final.replace('u', 'ü')
+        # ju -> jü, juan -> jüan, but jiu stays jiu
+        if initial in set(('j', 'q', 'x')) and final.startswith('u'):
+            final = 'ü' + final[1:]
     else:  # no initial
         if pinyin in EXCEPTIONS:
             final = EXCEPTIONS[pinyin]
@@ -78,9 +193,266 @@ def pinyin_split(pinyin_num):
             final = pinyin.replace('y', 'i')
         elif pinyin.startswith('w'):
             final = pinyin.replace('w', 'u')
+        else:
+            final = pinyin
 
     return (initial, final, tone)
 
+# integer codes for syllables: initial id, final id and tone as bit fields,
+# code = initial << 9 | final << 3 | tone, 0 for anything that isn't pinyin
+PINYIN_TONE_MASK = 0b111
+PINYIN_FINAL_MASK = 0b111111 << 3
+PINYIN_INITIAL_MASK = 0b11111 << 9
+PINYIN_INITIALS = tuple(sorted(set(pinyin_split(s)[0]
+                                   for s in PINYIN_SYLLABLES)))
+PINYIN_FINALS = tuple(sorted(set(pinyin_split(s)[1]
+                                 for s in PINYIN_SYLLABLES)))
+
+
+def _build_codes():
+    """ Create the table spelling -> code for all syllables. """
+
+    initial_ids = dict((initial, i) for i, initial
+                       in enumerate(PINYIN_INITIALS))
+    final_ids = dict((final, i) for i, final in enumerate(PINYIN_FINALS))
+    codes = {}
+    for syllable in PINYIN_SYLLABLES:
+        initial, final, _ = pinyin_split(syllable)
+        base = initial_ids[initial] << 9 | final_ids[final] << 3
+        codes[syllable] = base | 5
+        for tone in range(1, 6):
+            codes[syllable + str(tone)] = base | tone
+    for mark, num in _MARK_TO_NUM.items():
+        if mark.islower():
+            codes[mark] = codes[num]
+    return codes
+
+_SYLLABLE_CODES = _build_codes()
+
+
+def pinyin_encode(syllable):
+    """
+    Return the integer code of one syllable (numbers, marks or no tone).
+
+    The code fits into 14 bits, use PINYIN_TONE_MASK, PINYIN_FINAL_MASK and
+    PINYIN_INITIAL_MASK to compare only parts of it. Syllables without tone
+    get tone 5, anything which isn't a valid syllable gets 0.
+    """
+
+    code = _SYLLABLE_CODES.get(syllable)
+    if code is None:
+        code = _SYLLABLE_CODES.get(pinyin_normalize(syllable).lower(), 0)
+    return code
+
+def pinyin_decode(code):
+    """ Return the tuple (initial, final, tone) for a code from pinyin_encode. """
+
+    if not code:
+        raise ValueError('0 is the code for invalid syllables')
+    return (PINYIN_INITIALS[code >> 9], PINYIN_FINALS[code >> 3 & 0b111111],
+            code & PINYIN_TONE_MASK)
+
+def pinyin_encode_many(syllables):
+    """
+    Return the codes for an iterable of syllables as array('H').
+
+    Args:
+        syllables (iterable): e.g. 'zhong1 guo2'.split()
+    """
+
+    codes = _SYLLABLE_CODES
+    return array('H', [codes[s] if s in codes else pinyin_encode(s)
+                       for s in syllables])
+
+# groups of similar initials, not included: f, l, h
+IN_GROUPS = (
+    ('b', 'p'),
+    ('m', 'n'),
+    ('d', 't'),
+    ('g', 'k'),
+    ('j', 'q', 'x'),
+    ('zh', 'ch', 'sh', 'r'),
+    ('z', 'c', 's'))
+# groups of similar finals, not included: i, iu, ie
+FIN_GROUPS = (
+    ('a', 'ao'),
+    ('ai', 'ei'),
+    ('an', 'ang'),
+    ('o', 'ou'),
+    ('ong', 'iong', 'eng', 'en'),
+    ('e', 'er'),
+    ('ia', 'iao'),
+    ('ian', 'in', 'iang', 'ing'),
+    ('u', 'ua', 'uo'),
+    ('ui', 'uai'),
+    ('un', 'uan', 'uang', 'ueng'),
+    ('ü', 'üe'),
+    ('üan', 'ün'))
+
+
+class PinyinSimilarity(object):
+    """
+    Compare syllables with fixed margins and groups of similar sounds.
+
+    Everything that only depends on the margins and groups is computed once,
+    so use one object for many comparisons instead of pinyin_are_similar.
+    The meaning of margins, in_groups and fin_groups is the same as for
+    pinyin_are_similar.
+    """
+
+    def __init__(self, margins=None, in_groups=None, fin_groups=None):
+        self.margins = tuple(margins) if margins else (1, 1, 3)
+        self.in_groups = in_groups if in_groups else IN_GROUPS
+        self.fin_groups = fin_groups if fin_groups else FIN_GROUPS
+
+        # sound -> all sounds sharing a group with it
+        self.similar_dic = {}
+        for groups in (self.in_groups, self.fin_groups):
+            for group in groups:
+                for sound in group:
+                    self.similar_dic.setdefault(sound, set()).update(group)
+
+        # all (initial, final) of the valid syllables, with tones 1-5
+        self._inventory = {}
+        for syllable in PINYIN_SYLLABLES:
+            initial, final, _ = pinyin_split(syllable)
+            self._inventory.setdefault((initial, final), []).extend(
+                syllable + str(tone) for tone in range(1, 6))
+        self._all_sounds = (set(i for i, f in self._inventory),
+                            set(f for i, f in self._inventory),
+                            set(range(1, 6)))
+
+        # for initials and finals: sound -> representative of all sounds
+        # connected through groups
+        self._sound_class = ({}, {})
+        for groups, sound_class in zip((self.in_groups, self.fin_groups),
+                                       self._sound_class):
+            for group in groups:
+                old_reps = set(sound_class[sound] for sound in group
+                               if sound in sound_class)
+                members = set(group)
+                members.update(sound for sound, rep in sound_class.items()
+                               if rep in old_reps)
+                rep = min(members)
+                for sound in members:
+                    sound_class[sound] = rep
+
+        self._split_cache = {}
+        self._similar_cache = {}
+
+    def split(self, syllable):
+        """ Return pinyin_split(syllable), cached. """
+
+        try:
+            return self._split_cache[syllable]
+        except KeyError:
+            split = pinyin_split(syllable)
+            self._split_cache[syllable] = split
+            return split
+
+    def _similar_sounds(self, sound, index):
+        """ Return all values of part index similar to sound. """
+
+        margin = self.margins[index]
+        if margin == 3:
+            return self._all_sounds[index]
+        if margin == 0:
+            return set((sound,))
+        if index == 2:  # tones are either equal or anything
+            return self._all_sounds[index]
+        if margin == 2:
+            if sound == '':
+                return self._all_sounds[index]
+            return self.similar_dic.get(sound, set((sound,))) | set(('',))
+        return self.similar_dic.get(sound, set((sound,)))
+
+    def are_similar(self, pinyin1, pinyin2):
+        """ Return True if the two syllables are similar. """
+
+        return self.splits_are_similar(self.split(pinyin1),
+                                       self.split(pinyin2))
+
+    def splits_are_similar(self, split1, split2):
+        """
+        Return True if two split syllables are similar.
+
+        Args:
+            split1, split2 (tuple): (initial, final, tone) as returned by
+                pinyin_split or pinyin_tokenize
+        """
+
+        for index in range(3):
+            margin = self.margins[index]
+            pin1 = split1[index]
+            pin2 = split2[index]
+            if margin == 3 or pin1 == pin2:
+                continue
+            if margin == 0:
+                return False
+            if index == 2:  # tones are either equal or anything
+                continue
+            if margin == 2 and (pin1 == '' or pin2 == ''):
+                continue
+            if pin2 not in self.similar_dic.get(pin1, ()):
+                return False
+        return True
+
+    def signature(self, splits):
+        """
+        Return a hashable key for a sequence of split syllables.
+
+        Similar sequences of syllables always have the same signature, so
+        the signature can be used to put them into buckets. Sequences with
+        the same signature are not necessarily similar, e.g. if a sound
+        belongs to two groups, so check pairs with splits_are_similar.
+
+        Args:
+            splits (list): tuples (initial, final, tone), e.g. the output of
+                pinyin_tokenize
+        """
+
+        parts = []
+        in_class, fin_class = self._sound_class
+        for split in splits:
+            for index in range(3):
+                margin = self.margins[index]
+                if margin == 0:
+                    parts.append(split[index])
+                elif margin == 1 and index < 2:
+                    sound_class = fin_class if index else in_class
+                    parts.append(sound_class.get(split[index], split[index]))
+                else:  # anything or empty sound matching everything
+                    parts.append(None)
+        return tuple(parts)
+
+    def similar_syllables(self, syllable):
+        """
+        Return all valid syllables which are similar to syllable.
+
+        Returns:
+            syllables (frozenset): syllables with tone numbers, e.g.
+                {'ting1', 'ding3', ...} for 'ding3'. The result is computed
+                once per syllable and then served from a cache.
+        """
+
+        split = self.split(syllable)
+        if split in self._similar_cache:
+            return self._similar_cache[split]
+        initials = self._similar_sounds(split[0], 0)
+        finals = self._similar_sounds(split[1], 1)
+        tones = self._similar_sounds(split[2], 2)
+        result = []
+        for initial in initials:
+            for final in finals:
+                for candidate in self._inventory.get((initial, final), ()):
+                    if int(candidate[-1]) in tones:
+                        result.append(candidate)
+        result = frozenset(result)
+        self._similar_cache[split] = result
+        return result
+
+_SIMILARITY_CACHE = {}
+
 def pinyin_are_similar(pinyin1, pinyin2, margins=None,
                       in_groups=None, fin_groups=None):
     """
@@ -98,126 +470,199 @@ def pinyin_are_similar(pinyin1, pinyin2, margins=None,
             3: anything
         in_groups ([(group)]): A list of tuples, each tuple representing
             a group of initial sounds which are considered similar. For
-            the default, see below.
+            the default, see IN_GROUPS.
         fin_groups: See in_groups, same thing for final sounds.
 
     Returns:
         True/False
     """
 
-    # not included: f, l, h
-    IN_GROUPS = (
-            ('b', 'p'),
-            ('m', 'n'),
-            ('d', 't'),
-            ('g', 'k'),
-            ('j', 'q', 'x'),
-            ('zh', 'ch', 'sh', 'r'),
-            ('z', 'c', 's'))
-    # not included: i, iu, ie
-    FIN_GROUPS = (
-        ('a', 'ao'),
-        ('ai', 'ei'),
-        ('an', 'ang'),
-        ('o', 'ou'),
-        ('ong', 'iong', 'eng', 'en'),
-        ('e', 'er'),
-        ('ia', 'iao'),
-        ('ian', 'in', 'iang', 'ing'),
-        ('u', 'ua', 'uo'),
-        ('ui', 'uai'),
-        ('un', 'uan', 'uang', 'ueng'),
-        ('ü', 'üe'),
-        ('üan', 'ün'))
-    
-    if not margins:
-        margins = [1,1,3]
-    if not in_groups:
-        in_groups = IN_GROUPS
-    if not fin_groups:
-        fin_groups = FIN_GROUPS
-
-    # build dictionary
-    similar_dic = {}
-    for groups in (in_groups, fin_groups):
-        for group in groups:
-            for sound in group:
-                if sound in similar_dic:
-                    similar_dic[sound].update(set(group))
-                else:
-                    similar_dic[sound] = set(group)
-
-    pinyin1 = pinyin_split(pinyin1)
-    pinyin2 = pinyin_split(pinyin2)
-
-    result = True
-    for pin1, pin2, margin in zip(pinyin1, pinyin2, margins):
-        if margin == 0 and pin1 != pin2:
-            result = False
-        if margin == 3:
-            continue
-        if not isinstance(pin1, int):  # not the tone number
-            if margin == 2 and (pin1 == '' or pin2 == ''):
-                continue
-            else:
-                if pin1 in similar_dic:
-                    if pin1 not in similar_dic[pin2]:
-                        result = False
-                else:
-                    if pin1 != pin2:
-                        result = False
-
-    return result
+    key = (tuple(margins) if margins else None,
+           tuple(map(tuple, in_groups)) if in_groups else None,
+           tuple(map(tuple, fin_groups)) if fin_groups else None)
+    if key not in _SIMILARITY_CACHE:
+        _SIMILARITY_CACHE[key] = PinyinSimilarity(margins, in_groups,
+                                                  fin_groups)
+    return _SIMILARITY_CACHE[key].are_similar(pinyin1, pinyin2)
 
 def pinyin_num_to_mark(pinyin_num):
     """ Convert a string of pinyin with numbers to a string of pinyin with
     tonemarks.
     """
-    
-    pinyin_num = pinyin_normalize(pinyin_num)
-            
-    # replace the tone numbers
-    pinyin_mark = pinyin_num
-    pattern = re.compile('([a-zA-ZüÜ]{1,6})([1-5])') # could be more strict if necessary
-    replaced_letters = 0
-    for match in pattern.finditer(pinyin_num):
-        pin = match.group(1)
-        pin_low = pin.lower()
-        tone = int(match.group(2))
-        marked = None
-        for mark_letter, replace_letter in (
-            ('a','a'),
-            ('e','e'),
-            ('o','o'),
-            ('ui','i'),
-            ('iu','u'),
-            ('u','u'),
-            ('ü','ü'),
-            ('i','i')):
-            if not marked:
-                if mark_letter in pin_low:
-                    pos = pin_low.find(replace_letter)
-                    letter = pin[pos:pos + 1]  
-                    pin = pin.replace(letter, TONE_MARKS[letter][tone-1])
-                    marked = True
-        if marked:
-            # after each replacement, the string gets 1 shorter (number is gone)
-            cut_start = match.start() - replaced_letters
-            cut_end = match.end() - replaced_letters
-            pinyin_mark = pinyin_mark[:cut_start] + pin + pinyin_mark[cut_end:]
-            replaced_letters += 1
-    return pinyin_mark
+
+    return _NUM_PATTERN.sub(_num_to_mark_match, pinyin_normalize(pinyin_num))
+
+def _num_to_mark_match(match):
+    syllable = match.group()
+    if syllable in _NUM_TO_MARK:
+        return _NUM_TO_MARK[syllable]
+    marked = _mark_syllable(match.group(1), int(match.group(2)))
+    return syllable if marked is None else marked
 
 def pinyin_mark_to_num(pinyin_mark):
     """ Return one syllable of pinyin with numbers from one with marks. """
 
-    if len(pinyin_mark) > 6:
-        pass
-    for key_char, mark_chars in TONE_MARKS.items():
-        for tone, tone_char in enumerate(mark_chars[:4]):
-            if tone_char in pinyin_mark:
-                return (pinyin_mark.replace(tone_char,key_char) + str(tone+1))
-    return (pinyin_mark.replace(tone_char,key_char) + str(5))
+    if pinyin_mark in _MARK_TO_NUM:
+        return _MARK_TO_NUM[pinyin_mark]
+    for pos, char in enumerate(pinyin_mark):
+        if char in _MARK_CHARS:
+            plain, tone = _MARK_CHARS[char]
+            return pinyin_mark[:pos] + plain + pinyin_mark[pos + 1:] + str(tone)
+    return pinyin_mark + '5'
+
+def _mark_to_num_match(match):
+    run = match.group()
+    if run in _MARK_TO_NUM:
+        return _MARK_TO_NUM[run]
+    # unspaced syllables, e.g. Zhōngguó
+    syllables = _segment_run(run)
+    if syllables is None:
+        return run
+    return ''.join([_MARK_TO_NUM.get(syllable, syllable)
+                    for syllable in syllables])
+
+def pinyin_convert(text, to='mark'):
+    """
+    Convert all pinyin in a string to tone marks or to tone numbers.
+
+    Args:
+        text (str): any string containing pinyin, e.g. a cedict line
+        to ('mark'/'num'): the target format. For 'num', syllables with a
+            tone mark are converted, also in unspaced words (split like
+            with pinyin_segment, e.g. 'Zhōngguóde' -> 'Zhong1guo2de'),
+            everything else (including syllables without a tone mark) is
+            left as it is.
+    """
+
+    if to == 'mark':
+        return _NUM_PATTERN.sub(_num_to_mark_match, pinyin_normalize(text))
+    elif to == 'num':
+        return _MARKED_PATTERN.sub(_mark_to_num_match, text)
+    raise ValueError("to must be 'mark' or 'num', not %r" % (to,))
+
+def pinyin_convert_many(texts, to='mark'):
+    """
+    Yield pinyin_convert(text, to) for each string in texts.
+
+    Args:
+        texts (iterable): any iterable of strings, e.g. a list of the pinyin
+            of all words of a ChList or a file
+        to ('mark'/'num'): see pinyin_convert
+    """
+
+    if to == 'mark':
+        sub = _NUM_PATTERN.sub
+        normalize = _NORMALIZE_PATTERN.sub
+        umlaut = lambda m: _UMLAUT[m.group()]
+        for text in texts:
+            yield sub(_num_to_mark_match, normalize(umlaut, text))
+    elif to == 'num':
+        sub = _MARKED_PATTERN.sub
+        for text in texts:
+            yield sub(_mark_to_num_match, text)
+    else:
+        raise ValueError("to must be 'mark' or 'num', not %r" % (to,))
+
+def _segment_run(run):
+    """
+    Return the syllables of one run of letters or None if it isn't pinyin.
+
+    The segmentation with the fewest syllables wins. For a tie, the one with
+    the fewest syllables starting with a, o or e after the first one (these
+    would need an apostrophe), then the one with the longer first syllable,
+    so 'xiangong' -> 'xian', 'gong' and 'fangan' -> 'fan', 'gan'.
+    """
+
+    low = run.lower()
+    length = len(low)
+    forms = _SYLLABLE_FORMS
+    # cost[i]: (syllables needed for low[i:], syllables after the first one
+    # starting with a vowel), next_pos[i]: end of the first of those
+    # syllables, -1 = no segmentation possible
+    cost = [(length + 1, 0)] * (length + 1)
+    next_pos = [-1] * (length + 1)
+    cost[length] = (0, 0)
+    next_pos[length] = length
+    for start in range(length - 1, -1, -1):
+        for end in range(min(length, start + _MAX_FORM_LEN), start, -1):
+            if next_pos[end] == -1:
+                continue
+            count, vowels = cost[end]
+            if end < length and low[end] in _VOWEL_INITIALS:
+                vowels += 1
+            if (count + 1, vowels) < cost[start] and low[start:end] in forms:
+                cost[start] = (count + 1, vowels)
+                next_pos[start] = end
+    if next_pos[0] == -1:
+        return None
+    syllables = []
+    start = 0
+    while start < length:
+        end = next_pos[start]
+        syllables.append(run[start:end])
+        start = end
+    return syllables
+
+def pinyin_segment(text):
+    """
+    Split a string of pinyin into syllables.
+
+    Works with tone marks, tone numbers or without tones, with or without
+    spaces and apostrophes, e.g.
+    pinyin_segment("Zhōngguórén xī'ān nǎr") ->
+        ['Zhōng', 'guó', 'rén', 'xī', 'ān', 'nǎ', 'r']
+
+    Runs of letters which can't be split into valid syllables (e.g. English
+    words) are returned as they are.
+    """
+
+    syllables = []
+    for match in _PINYIN_RUN_PATTERN.finditer(pinyin_normalize(text)):
+        run = match.group()
+        segmented = _segment_run(run)
+        if segmented is None:
+            syllables.append(run)
+        else:
+            syllables.extend(segmented)
+    return syllables
+
+def _split_syllable(syllable):
+    """ pinyin_split for any spelling in _SYLLABLE_FORMS, cached. """
+
+    syllable = syllable.lower()
+    if syllable not in _SPLIT_CACHE:
+        _SPLIT_CACHE[syllable] = pinyin_split(pinyin_mark_to_num(syllable)
+                                              if not syllable[-1].isdigit()
+                                              else syllable)
+    return _SPLIT_CACHE[syllable]
+
+def pinyin_tokenize(text):
+    """
+    Return a list of tuples (initial, final, tone) for a string of pinyin.
+
+    The string is segmented like in pinyin_segment, each syllable is split
+    like in pinyin_split. Syllables without tone get tone 5. Runs of letters
+    which aren't pinyin are skipped.
+    """
+
+    tokens = []
+    for match in _PINYIN_RUN_PATTERN.finditer(pinyin_normalize(text)):
+        segmented = _segment_run(match.group())
+        if segmented is not None:
+            tokens.extend(_split_syllable(s) for s in segmented)
+    return tokens
+
+def pinyin_tokenize_many(texts):
+    """
+    Yield pinyin_tokenize(text) for each string in texts.
+
+    Args:
+        texts (iterable): any iterable of strings, e.g. a file or the
+            pinyin of all entries of a dictionary
+    """
+
+    for text in texts:
+        yield pinyin_tokenize(text)
 
 def char_frequency(string):
     """
@@ -228,55 +673,49 @@ def char_frequency(string):
     the character in the string.
     """
 
-    string = only_hanzi(string)
-    freq_cnt = Counter()
-    for char in string:
-        freq_cnt[char] += 1
-    return freq_cnt.most_common()
+    return Counter(only_hanzi(string)).most_common()
 
 def only_hanzi(word):
     """ Return the string minus everything which is not a hanzi. """
 
-    # taken from stackoverflow.com !!
-    if word.strip() == '':
-        return ''
-    LHan = [[0x2E80, 0x2E99],    # Han # So  [26] CJK RADICAL REPEAT, CJK RADICAL RAP
-            [0x2E9B, 0x2EF3],    # Han # So  [89] CJK RADICAL CHOKE, CJK RADICAL C-SIMPLIFIED TURTLE
-            [0x2F00, 0x2FD5],    # Han # So [214] KANGXI RADICAL ONE, KANGXI RADICAL FLUTE
-            0x3005,              # Han # Lm       IDEOGRAPHIC ITERATION MARK
-            0x3007,              # Han # Nl       IDEOGRAPHIC NUMBER ZERO
-            [0x3021, 0x3029],    # Han # Nl   [9] HANGZHOU NUMERAL ONE, HANGZHOU NUMERAL NINE
-            [0x3038, 0x303A],    # Han # Nl   [3] HANGZHOU NUMERAL TEN, HANGZHOU NUMERAL THIRTY
-            0x303B,              # Han # Lm       VERTICAL IDEOGRAPHIC ITERATION MARK
-            [0x3400, 0x4DB5],    # Han # Lo [6582] CJK UNIFIED IDEOGRAPH-3400, CJK UNIFIED IDEOGRAPH-4DB5
-            [0x4E00, 0x9FC3],    # Han # Lo [20932] CJK UNIFIED IDEOGRAPH-4E00, CJK UNIFIED IDEOGRAPH-9FC3
-            [0xF900, 0xFA2D],    # Han # Lo [302] CJK COMPATIBILITY IDEOGRAPH-F900, CJK COMPATIBILITY IDEOGRAPH-FA2D
-            [0xFA30, 0xFA6A],    # Han # Lo  [59] CJK COMPATIBILITY IDEOGRAPH-FA30, CJK COMPATIBILITY IDEOGRAPH-FA6A
-            [0xFA70, 0xFAD9],    # Han # Lo [106] CJK COMPATIBILITY IDEOGRAPH-FA70, CJK COMPATIBILITY IDEOGRAPH-FAD9
-            [0x20000, 0x2A6D6],  # Han # Lo [42711] CJK UNIFIED IDEOGRAPH-20000, CJK UNIFIED IDEOGRAPH-2A6D6
-            [0x2F800, 0x2FA1D]]  # Han # Lo [542] CJK COMPATIBILITY IDEOGRAPH-2F800, CJK COMPATIBILITY IDEOGRAPH-2FA1D
-
-    def build_re():
-        pattern_list = []
-        for char_range in LHan:
-            if isinstance(char_range, list):
-                from_char, to_char = char_range
-                try: 
-                    from_char = chr(from_char)
-                    to_char = chr(to_char)
-                    pattern_list.append('%s-%s' % (from_char, to_char))
-                except: 
-                    pass # A narrow python build, so can't use chars > 65535 without surrogate pairs!
-            else:
-                try:
-                    pattern_list.append(chr(char_range))
-                except:
-                    pass
-
-        pattern = '[%s]' % ''.join(pattern_list)
-        return re.compile(pattern)
-
-    pattern = build_re()
-    hanzi_only = ''.join([c for c in word if pattern.match(c)])
-
-    return hanzi_only
+    return _NON_HAN_PATTERN.sub('', word)
+
+def only_hanzi_many(words):
+    """
+    Yield only_hanzi(word) for each string in words.
+
+    Args:
+        words (iterable): any iterable of strings, e.g. a list or a file
+    """
+
+    sub = _NON_HAN_PATTERN.sub
+    for word in words:
+        yield sub('', word)
+
+def only_hanzi_stream(text_file, skip_empty=False):
+    """
+    Filter a file object line by line, yielding only the hanzi of each line.
+
+    Args:
+        text_file (file object): a file opened for reading in text mode
+        skip_empty (bool): don't yield anything for lines without hanzi
+    """
+
+    sub = _NON_HAN_PATTERN.sub
+    for line in text_file:
+        hanzi = sub('', line)
+        if hanzi or not skip_empty:
+            yield hanzi
+
+def hanzi_spans(word):
+    """
+    Return the positions of all runs of hanzi in a string.
+
+    Nothing is copied, use word[start:end] to get the hanzi.
+
+    Returns:
+        spans (list): a list of tuples (start, end), e.g.
+            hanzi_spans('ab漢字c中') -> [(2, 4), (5, 6)]
+    """
+
+    return [match.span() for match in _HAN_PATTERN.finditer(word)]
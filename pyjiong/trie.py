@@ -0,0 +1,154 @@
+from array import array
+from bisect import bisect_left
+from pyjiong.filesupport import iter_cedict
+
+
+class HeadwordTrie(object):
+    """
+    A prefix tree over words, e.g. the headwords of cedict.
+
+    The nodes are stored in a few flat arrays instead of one object per
+    node: the outgoing edges of each node are stored next to each other,
+    sorted by character, so finding a child is a binary search over them.
+
+    Args:
+        words (iterable): the words, duplicates are ignored
+    """
+
+    def __init__(self, words=()):
+        # build a temporary tree of dicts, then flatten it breadth first
+        root = {}
+        count = 0
+        for word in words:
+            node = root
+            for char in word:
+                node = node.setdefault(char, {})
+            if None not in node:
+                node[None] = True  # end of a word
+                count += 1
+        self._length = count
+
+        self._first_edge = array('I')   # per node: index of the first edge
+        self._edge_count = array('I')   # per node: number of edges
+        self._terminal = bytearray()    # per node: 1 if a word ends here
+        self._labels = array('I')       # per edge: code point
+        self._targets = array('I')      # per edge: node the edge leads to
+        queue = [root]
+        for node in queue:  # the queue grows while iterating
+            chars = sorted(char for char in node if char is not None)
+            self._first_edge.append(len(self._labels))
+            self._edge_count.append(len(chars))
+            self._terminal.append(1 if None in node else 0)
+            for char in chars:
+                self._labels.append(ord(char))
+                self._targets.append(len(queue))
+                queue.append(node[char])
+
+    @classmethod
+    def from_cedict(cls, cedict):
+        """ Create a trie with trad and simp words from open_cedict output. """
+
+        def words():
+            for key, entries in cedict.items():
+                yield key
+                for entry in entries:
+                    yield entry[0]
+        return cls(words())
+
+    @classmethod
+    def from_cedict_file(cls, cedict_file):
+        """ Create a trie with trad and simp words from a cedict file. """
+
+        def words():
+            for entry in iter_cedict(cedict_file):
+                yield entry.trad
+                yield entry.simp
+        return cls(words())
+
+    def __len__(self):
+        return self._length
+
+    def _child(self, node, char):
+        """ Return the child of node for char or -1. """
+
+        start = self._first_edge[node]
+        end = start + self._edge_count[node]
+        code = ord(char)
+        pos = bisect_left(self._labels, code, start, end)
+        if pos < end and self._labels[pos] == code:
+            return self._targets[pos]
+        return -1
+
+    def _find(self, word):
+        """ Return the node for word or -1. """
+
+        node = 0
+        for char in word:
+            node = self._child(node, char)
+            if node == -1:
+                break
+        return node
+
+    def __contains__(self, word):
+        node = self._find(word)
+        return node != -1 and self._terminal[node] == 1
+
+    def prefixes(self, text, pos=0):
+        """
+        Return all words which start at text[pos], shortest first.
+
+        e.g. prefixes('中國人很多') -> ['中', '中國', '中國人']
+        """
+
+        found = []
+        node = 0
+        for end in range(pos, len(text)):
+            node = self._child(node, text[end])
+            if node == -1:
+                break
+            if self._terminal[node]:
+                found.append(text[pos:end + 1])
+        return found
+
+    def longest_prefix(self, text, pos=0):
+        """
+        Return the longest word starting at text[pos], '' if there is none.
+        """
+
+        longest = pos
+        node = 0
+        for end in range(pos, len(text)):
+            node = self._child(node, text[end])
+            if node == -1:
+                break
+            if self._terminal[node]:
+                longest = end + 1
+        return text[pos:longest]
+
+    def complete(self, prefix, limit=None):
+        """
+        Return the words starting with prefix in sorted order.
+
+        Args:
+            prefix (str): e.g. '中国'
+            limit (int): return at most this many words
+        """
+
+        node = self._find(prefix)
+        found = []
+        if node == -1 or limit == 0:
+            return found
+        # depth first search, edges pushed in reverse to keep the order
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            if self._terminal[node]:
+                found.append(word)
+                if limit is not None and len(found) >= limit:
+                    break
+            start = self._first_edge[node]
+            for edge in range(start + self._edge_count[node] - 1,
+                              start - 1, -1):
+                stack.append((self._targets[edge],
+                              word + chr(self._labels[edge])))
+        return found
@@ -1,9 +1,14 @@
 import sys
+import copy
+import gc
 import os
+import pickle
 import unittest
+import shutil
+import tempfile
 sys.path.append(os.path.abspath(".."))
 import pyjiong 
-from io import StringIO
+from io import BytesIO, StringIO
 
 class PyjiongTest(unittest.TestCase):
     def test_open_unihan(self):
@@ -35,6 +40,268 @@ class PyjiongTest(unittest.TestCase):
                     ['kHanyuPinyin','kDefinition','kMandarin'])
             self.assertEqual(real_output,expected_output)
 
+    def test_open_cedict(self):
+        with open('./textfiles/cedict_ts_test.u8',
+                  mode='r',
+                  encoding='utf-8') as cedict_file:
+            cedict = pyjiong.open_cedict(cedict_file, 'simp')
+            cedict_file.seek(0)
+            entries = list(pyjiong.iter_cedict(cedict_file,
+                                               keys=set(['量', '馬']),
+                                               pinyin_prefix='MA'))
+        self.assertEqual(sorted(cedict), ['暂', '量', '马'])
+        self.assertEqual(cedict['暂'],
+                         [('暫', 'zan4', ('temporary',), {'tw': 'zhan4'})])
+        self.assertEqual([(e.simp, e.pinyin, e.extra) for e in entries],
+                         [('马', 'Ma3', {}), ('马', 'ma3', {'cl': '匹[pi]'})])
+        entries = pyjiong.iter_cedict(
+            StringIO('\n量 量 [liang2] /to measure/\n'),
+            predicate=lambda entry: 'to measure' in entry.definitions)
+        self.assertEqual([e.pinyin for e in entries], ['liang2'])
+        self.assertRaises(ValueError, list,
+                          pyjiong.iter_cedict(StringIO('量 量 liang2\n')))
+
+    def test_open_cedict_compact(self):
+        with open('./textfiles/cedict_ts_test.u8',
+                  mode='r',
+                  encoding='utf-8') as cedict_file:
+            cedict = pyjiong.open_cedict(cedict_file)
+            cedict_file.seek(0)
+            shared = {}
+            compact = pyjiong.open_cedict(cedict_file, compact=shared)
+            cedict_file.seek(0)
+            compact_simp = pyjiong.open_cedict(cedict_file, 'simp',
+                                               compact=shared)
+        self.assertEqual(dict((k, list(v)) for k, v in compact.items()),
+                         cedict)
+        self.assertIs(compact['量'][0][3], compact['量'][1][3])
+        self.assertIs(compact['量'][0][0], compact_simp['量'][0][0])
+        with self.assertRaises(TypeError):
+            compact['量'][0][3]['tw'] = 'liang4'
+        loaded = pickle.loads(pickle.dumps(compact))
+        self.assertEqual(loaded, compact)
+        self.assertIs(loaded['量'][0][3], compact['量'][0][3])
+        with open('./textfiles/cedict_ts_test.u8',
+                  mode='r',
+                  encoding='utf-8') as cedict_file:
+            for not_compact in (None, 0):
+                cedict_file.seek(0)
+                self.assertIsInstance(pyjiong.open_cedict(
+                    cedict_file, compact=not_compact)['量'], list)
+
+    def test_parse_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'cedict.u8')
+            shutil.copy('./textfiles/cedict_ts_test.u8', source)
+            cache = pyjiong.ParseCache(os.path.join(temp_dir, 'cache'))
+            first = cache.open_cedict(source, 'simp')
+            self.assertEqual(cache.open_cedict(source, 'simp'), first)
+            self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1})
+            cache.open_cedict(source, 'trad')
+            self.assertEqual(cache.misses, 2)
+            with open(source, mode='a', encoding='utf-8') as cedict_file:
+                cedict_file.write('囧 囧 [jiong3] /embarrassed/\n')
+            first_updated = cache.open_cedict(source, 'simp')
+            self.assertIn('囧', first_updated)
+            self.assertEqual(cache.stats(), {'hits': 1, 'misses': 3})
+            # only touched: the hash is the same
+            stat = os.stat(source)
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            cache.open_cedict(source, 'simp')
+            self.assertEqual(cache.stats(), {'hits': 2, 'misses': 3})
+            # the new mtime was stored, the file isn't hashed again
+            cache._file_hash = None
+            cache.open_cedict(source, 'simp')
+            del cache._file_hash
+            self.assertEqual(cache.stats(), {'hits': 3, 'misses': 3})
+            no_hash = pyjiong.ParseCache(os.path.join(temp_dir, 'cache'),
+                                         check_hash=False)
+            os.utime(source, ns=(stat.st_atime_ns,
+                                 stat.st_mtime_ns + 2 * 10**9))
+            no_hash.open_cedict(source, 'simp')
+            no_hash.open_cedict(source, 'simp')
+            self.assertEqual(no_hash.stats(), {'hits': 1, 'misses': 1})
+            # a broken cache file is replaced
+            for name in os.listdir(os.path.join(temp_dir, 'cache')):
+                with open(os.path.join(temp_dir, 'cache', name),
+                          mode='wb') as cache_file:
+                    cache_file.write(b'broken')
+            self.assertEqual(cache.open_cedict(source, 'simp'), first_updated)
+            self.assertEqual(cache.stats(), {'hits': 3, 'misses': 4})
+            # a cache of something that doesn't exist any more
+            for name in os.listdir(os.path.join(temp_dir, 'cache')):
+                with open(os.path.join(temp_dir, 'cache', name),
+                          mode='wb') as cache_file:
+                    cache_file.write(b'\x80\x04cpyjiong\nNoSuchClass\n.')
+            self.assertEqual(cache.open_cedict(source, 'simp'), first_updated)
+            self.assertEqual(cache.stats(), {'hits': 3, 'misses': 5})
+            unihan = cache.open_unihan('./textfiles/unihan_test.txt',
+                                       ['kMandarin'])
+            self.assertEqual(unihan['糯'], {'kMandarin': ['nuò']})
+
+    def test_cedict_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            index_path = os.path.join(temp_dir, 'cedict.idx')
+            with open('./textfiles/cedict_ts_test.u8', mode='r',
+                      encoding='utf-8') as cedict_file,\
+                    open(index_path, mode='wb') as index_file:
+                pyjiong.build_cedict_index(cedict_file, index_file)
+            with pyjiong.CedictIndex(index_path) as index:
+                self.assertEqual(list(index.keys()),
+                                 sorted(['馬', '马', '暫', '暂', '量']))
+                self.assertEqual([e.pinyin for e in index.lookup('马')],
+                                 ['Ma3', 'ma3'])
+                self.assertEqual(index.lookup('馬'), index.lookup('马'))
+                self.assertEqual(index.lookup('囧'), [])
+                self.assertIn('暫', index)
+                self.assertNotIn('暫時', index)
+                self.assertEqual([k for k, e in index.prefix('量')], ['量'])
+
+    def test_headword_trie(self):
+        trie = pyjiong.HeadwordTrie(['中', '中國', '中國人', '國', '中文'])
+        self.assertEqual(len(trie), 5)
+        self.assertEqual(trie.prefixes('中國人很多'), ['中', '中國', '中國人'])
+        self.assertEqual(trie.longest_prefix('很中國', 1), '中國')
+        self.assertEqual(trie.longest_prefix('很中國'), '')
+        self.assertEqual(trie.complete('中'), ['中', '中國', '中國人', '中文'])
+        self.assertEqual(trie.complete('中', 2), ['中', '中國'])
+        self.assertIn('中國', trie)
+        self.assertNotIn('中國很', trie)
+        with open('./textfiles/cedict_ts_test.u8',
+                  mode='r',
+                  encoding='utf-8') as cedict_file:
+            from_file = pyjiong.HeadwordTrie.from_cedict_file(cedict_file)
+            cedict_file.seek(0)
+            from_dict = pyjiong.HeadwordTrie.from_cedict(
+                pyjiong.open_cedict(cedict_file))
+        self.assertEqual(from_file.complete(''), from_dict.complete(''))
+        self.assertEqual(len(from_file), 5)
+
+    def test_open_unihan_dir(self):
+        kvalues = ['kHanyuPinyin', 'kDefinition', 'kMandarin']
+        with open('./textfiles/unihan_test.txt',
+                  mode='r',
+                  encoding='utf-8') as txt_file:
+            lines = txt_file.readlines()
+            txt_file.seek(0)
+            expected_output = pyjiong.open_unihan(txt_file, kvalues)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for no, part in enumerate((lines[:15], lines[15:])):
+                with open(os.path.join(temp_dir, 'Unihan_%d.txt' % no),
+                          mode='w', encoding='utf-8') as txt_file:
+                    txt_file.writelines(part)
+            for processes in (1, 2):
+                unihan = pyjiong.open_unihan_dir(temp_dir, kvalues,
+                                                 processes)
+                self.assertEqual(unihan.legacy(), expected_output)
+        self.assertEqual(unihan['糯'], expected_output['糯'])
+        self.assertEqual(unihan.get('愞', 'kMandarin'), ['nuò'])
+        self.assertIsNone(unihan.get('愞', 'kHanyuPinyin'))
+        self.assertEqual(unihan.column('kDefinition')[0x611E],
+                         'timid, apprehensive')
+        self.assertNotIn('中', unihan)
+
+    def test_radical_stroke_index(self):
+        unihan = {'好': {'kRSUnicode': '38.3', 'kTotalStrokes': '6'},
+                  '妈': {'kRSUnicode': "38.3", 'kTotalStrokes': '6'},
+                  '媽': {'kRSUnicode': '38.10', 'kTotalStrokes': '13'},
+                  '马': {'kRSUnicode': "187'.0", 'kTotalStrokes': '3'},
+                  '乾': {'kRSUnicode': '5.10 119.5', 'kTotalStrokes': '11'}}
+        index = pyjiong.RadicalStrokeIndex(unihan)
+        self.assertEqual(index.lookup(38, 3), ['好', '妈'])
+        self.assertEqual(index.lookup(38), ['好', '妈', '媽'])
+        self.assertEqual(index.lookup(187), ['马'])
+        self.assertEqual(index.lookup(119, 5), ['乾'])
+        self.assertEqual(index.lookup(1), [])
+        self.assertEqual(index.by_strokes(6), ['好', '妈'])
+        self.assertEqual(index.by_strokes(3, 11), ['马', '好', '妈', '乾'])
+        words = ['媽媽', '好', '马', '囧']
+        words.sort(key=index.sort_key)
+        self.assertEqual(words, ['马', '好', '媽媽', '囧'])
+        index_file = BytesIO()
+        index.save(index_file)
+        index_file.seek(0)
+        self.assertEqual(pyjiong.RadicalStrokeIndex.load(index_file)
+                         .lookup(38), index.lookup(38))
+
+    def test_open_tatoeba(self):
+        sentences = ('1\tcmn\t你好。\n2\teng\tHello.\n3\tdeu\tHallo.\n'
+                     '4\tcmn\t谢谢。\n5\tfra\tMerci.\n6\teng\tThanks.\n')
+        links = '1\t2\n1\t3\n2\t1\n4\t5\n4\t6\n5\t4\n'
+        expected_output = [
+            [['1', 'cmn', '你好。'], ['2', 'eng', 'Hello.'],
+             ['3', 'deu', 'Hallo.']],
+            [['4', 'cmn', '谢谢。'], ['6', 'eng', 'Thanks.'], '']]
+        self.assertEqual(pyjiong.open_tatoeba(StringIO(sentences),
+                                              StringIO(links),
+                                              secondary_langs=['eng', 'deu']),
+                         expected_output)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            groups = pyjiong.iter_tatoeba(StringIO(sentences), StringIO(links),
+                                          secondary_langs=['eng', 'deu'],
+                                          sorted_links=True,
+                                          spill_dir=temp_dir)
+            self.assertEqual(list(groups), expected_output)
+            self.assertEqual(os.listdir(temp_dir), [])
+        # sentences out of order, the last line of an id wins
+        sentences = '6\teng\tThanks!\n' + sentences + '2\teng\tHi.\n'
+        groups = pyjiong.iter_tatoeba(StringIO(sentences), StringIO(links))
+        self.assertEqual(list(groups), [[['1', 'cmn', '你好。'], ['2', 'eng', 'Hi.']],
+                                        [['4', 'cmn', '谢谢。'],
+                                         ['6', 'eng', 'Thanks.']]])
+
+    def test_sentence_index(self):
+        groups = [[['3', 'cmn', '我是中国人。'], ''],
+                  [['5', 'cmn', '中国很大,人很多。'], ''],
+                  [['7', 'cmn', '国人'], '']]
+        index = pyjiong.SentenceIndex()
+        self.assertEqual(index.update(groups), 3)
+        self.assertEqual(index.find(['中国', '人']),
+                         [(3, '我是中国人。'), (5, '中国很大,人很多。')])
+        self.assertEqual(index.find(['国人']), [(7, '国人'), (3, '我是中国人。')])
+        self.assertEqual(index.find(['国'], limit=1), [(7, '国人')])
+        self.assertEqual(index.find(['囧']), [])
+        # incremental: ids already indexed are skipped, older ids are merged
+        self.assertEqual(index.update([[['1', 'cmn', '中文'], ''],
+                                       [['3', 'cmn', '我是中国人。'], '']]), 1)
+        self.assertEqual(index.postings('中'), [1, 3, 5])
+        segmenter = pyjiong.Segmenter(['中国', '国人', '中国人'])
+        index = pyjiong.SentenceIndex(segmenter)
+        index.update(groups)
+        self.assertEqual(index.postings('中国人'), [3])
+        # words inside longer words of the segmentation are found as well
+        self.assertEqual(index.postings('中国'), [3, 5])
+        self.assertEqual(index.find(['中国']),
+                         [(3, '我是中国人。'), (5, '中国很大,人很多。')])
+        self.assertEqual(index.find(['很多']), [(5, '中国很大,人很多。')])
+        self.assertEqual(index.find(['国人']), [(7, '国人'), (3, '我是中国人。')])
+        index_file = BytesIO()
+        index.save(index_file)
+        index_file.seek(0)
+        loaded = pyjiong.SentenceIndex.load(index_file)
+        self.assertEqual(loaded.find(['中国']), index.find(['中国']))
+
+    def test_rank_sentences(self):
+        known_list = pyjiong.ChList('known', words=[
+            pyjiong.ChWord({'simp': simp}) for simp in ['我', '是', '人', '很好']])
+        known = pyjiong.known_units(known_list, characters=True)
+        self.assertEqual(known, set('我是人很好'))
+        self.assertEqual(pyjiong.score_sentence('我是囧!', known),
+                         (1 - 1 / 3, ['囧']))
+        groups = [[[str(no), 'cmn', sentence], ''] for no, sentence in
+                  enumerate(['我是中人。', '我很好,是中人。', '中人', '我是中国人。',
+                             '我是猫。', '猫很好。', '没有'])]
+        expected_output = {
+            '中': [(1 - 1 / 6, 1, '我很好,是中人。'), (0.75, 0, '我是中人。')],
+            '猫': [(1 - 1 / 3, 5, '猫很好。'), (1 - 1 / 3, 4, '我是猫。')]}
+        for processes in (1, 2):
+            self.assertEqual(pyjiong.rank_sentences(groups, known, k=2,
+                                                    processes=processes,
+                                                    chunk_size=2),
+                             expected_output)
+        self.assertEqual(list(pyjiong.rank_sentences(groups, known,
+                                                     targets=['猫'])), ['猫'])
+
     def test_open_save_list(self):
         with open('./textfiles/skritter_test.txt',
                   mode='r',
@@ -48,6 +315,226 @@ class PyjiongTest(unittest.TestCase):
             sample_out = sample_file_out.getvalue() + '\n'
             self.assertEqual(sample_in, sample_out)
 
+    def test_open_text_list_parallel(self):
+        path = './textfiles/skritter_test.txt'
+        with open(path, mode='r', encoding='utf-8') as skritter_file:
+            expected_output = pyjiong.open_text_list(skritter_file)
+        for processes, chunk_size in ((1, 1 << 20), (1, 50), (2, 200)):
+            self.assertEqual(pyjiong.open_text_list_parallel(
+                path, processes=processes, chunk_size=chunk_size),
+                expected_output)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'list.txt')
+            with open(path, mode='w', encoding='utf-8') as list_file:
+                list_file.write('//A\n中\n//B\n# comment\n//C\n国\n//D\n')
+            for chunk_size in range(1, 20):
+                self.assertEqual(pyjiong.open_text_list_parallel(
+                    path, processes=2, chunk_size=chunk_size),
+                    ([['A'], ['C'], ['D']],
+                     [{'simp': '中', 'section': 0, 'number': 0},
+                      {'simp': '国', 'section': 1, 'number': 1}]))
+        # ChWords straight from the chunks, the same as with open_file
+        path = './textfiles/skritter_test.txt'
+        expected_list = pyjiong.ChList('test-list')
+        with open(path, mode='r', encoding='utf-8') as skritter_file:
+            expected_list.open_file(skritter_file)
+        for processes, chunk_size in ((1, 1 << 20), (2, 100)):
+            test_list = pyjiong.ChList('test-list')
+            test_list.open_file_parallel(path, processes=processes,
+                                         chunk_size=chunk_size)
+            self.assertEqual(test_list.sections, expected_list.sections)
+            self.assertEqual([w.as_dict() for w in test_list.words],
+                             [w.as_dict() for w in expected_list.words])
+        # other attributes, also names which aren't identifiers
+        custom = {'attr_order': ['simp', 'pinyin', 'my-freq', 'class']}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'list.txt')
+            with open(path, mode='w', encoding='utf-8') as list_file:
+                list_file.write('//A\n中\tzhong1\t12\tx\n国\n' * 5)
+            for processes in (1, 2):
+                test_list.open_file_parallel(path, custom, processes, 10)
+                self.assertEqual(
+                    [w.as_dict() for w in test_list.words[:2]],
+                    [{'simp': '中', 'trad': '', 'pinyin': 'zhong1',
+                      'definition': '', 'my-freq': '12', 'class': 'x',
+                      'section': 0, 'number': 0},
+                     {'simp': '国', 'trad': '', 'pinyin': '',
+                      'definition': '', 'section': 0, 'number': 1}])
+                self.assertEqual(len(test_list.words), 10)
+
+    def test_chword(self):
+        word = pyjiong.ChWord({'simp': '中', 'freq': '12'})
+        self.assertEqual((word.simp, word.trad, word.number), ('中', '', -1))
+        self.assertEqual(word.freq, '12')
+        self.assertFalse(hasattr(pyjiong.ChWord(), 'freq'))
+        copied = copy.copy(word)
+        copied.number = 3
+        self.assertEqual(copied.as_dict(), {
+            'simp': '中', 'trad': '', 'pinyin': '', 'definition': '',
+            'section': -1, 'number': 3, 'freq': '12'})
+        self.assertEqual(word.freq, '12')
+        self.assertEqual(pickle.loads(pickle.dumps(word)).as_dict(),
+                         word.as_dict())
+        copied.freq = '13'
+        self.assertEqual(word.freq, '12')
+        test_list = pyjiong.ChList('test-list', words=[word])
+        sample_out = StringIO()
+        test_list.save_file(sample_out, {'attr_order': ['simp', 'freq']})
+        self.assertEqual(sample_out.getvalue(), '中\t12')
+        # saving doesn't create an instance dictionary
+        plain = pyjiong.ChWord({'simp': '国'})
+        test_list = pyjiong.ChList('test-list', words=[plain])
+        test_list.save_file(StringIO(), {'attr_order': ['simp', 'freq']})
+        self.assertEqual(plain.as_dict(['simp', 'freq']),
+                         {'simp': '国', 'freq': ''})
+        self.assertFalse([referent for referent in gc.get_referents(plain)
+                          if isinstance(referent, dict)])
+
+    def test_chlist_indexes(self):
+        words = [pyjiong.ChWord({'simp': simp}) for simp
+                 in ['中国', '人', '中国人', '谢谢']]
+        test_list = pyjiong.ChList('test-list', words=words)
+        test_list.create_index('simp', True)
+        self.assertEqual(test_list.simp_ii['中'], [0, 2])
+        self.assertIs(test_list.get_index('simp', True), test_list.simp_ii)
+        self.assertEqual(test_list.index_stats(), {'hits': 1, 'rebuilds': 1})
+        test_list.get_index('simp')
+        self.assertEqual([w.simp for w in test_list.lookup('simp', '国',
+                                                             True)],
+                         ['中国', '中国人'])
+
+        # updated, not rebuilt
+        test_list.append(pyjiong.ChWord({'simp': '人人'}))
+        test_list.remove(words[0])
+        test_list.set_attr(2, 'simp', '谢')
+        expected_output = pyjiong.ChList('fresh', words=list(test_list.words))
+        for iterate in (False, True):
+            self.assertEqual(test_list.get_index('simp', iterate),
+                             expected_output.get_index('simp', iterate))
+        self.assertEqual(test_list.simp_ii,
+                         {'人': [0, 1, 3, 3], '中': [1], '国': [1], '谢': [2]})
+        self.assertEqual(test_list.index_stats(), {'hits': 4, 'rebuilds': 2})
+        self.assertEqual(sorted(test_list.indexes()),
+                         [('simp', False), ('simp', True)])
+
+        # changing the list directly invalidates the indexes
+        test_list.words.append(pyjiong.ChWord({'simp': '中'}))
+        self.assertEqual(test_list.indexes(), [])
+        self.assertEqual(len(test_list.lookup('simp', '中', True)), 2)
+        self.assertEqual(test_list.index_rebuilds, 3)
+        test_list.mix_with(expected_output, 'simp', True)
+        test_list.mix_with(expected_output, 'simp', True)
+        self.assertEqual(test_list.index_stats(), {'hits': 7, 'rebuilds': 4})
+
+    def test_mix_with_views(self):
+        list1 = pyjiong.ChList('l1', sections=[['A'], ['B'], ['C']], words=[
+            pyjiong.ChWord({'simp': simp, 'section': section, 'number': no})
+            for no, (simp, section) in enumerate(
+                [('中', 0), ('国', 1), ('人', 2), ('好', 2)])])
+        list2 = pyjiong.ChList('l2', sections=[['X']], words=[
+            pyjiong.ChWord({'simp': simp, 'section': 0, 'number': no})
+            for no, simp in enumerate(['国人', '好', '猫'])])
+        for iterate in (False, True):
+            lists = list1.mix_with(list2, 'simp', iterate)
+            views = list1.mix_with(list2, 'simp', iterate, views=True)
+            for chlist, view in zip(lists, views):
+                self.assertEqual((view.name, view.sections),
+                                 (chlist.name, chlist.sections))
+                self.assertEqual([(w.simp, s) for w, s in view.rows()],
+                                 [(w.simp, w.section) for w in chlist.words])
+        # no copies, word is the word of the source list
+        self.assertEqual(len(views[1]), 4)
+        self.assertIs(views[1].word(0), list1.words[1])
+        self.assertEqual([views[1].section(no) for no in range(4)],
+                         [0, 1, 1, 1])
+        self.assertEqual(views[1].sections, [['B'], ['C']])
+        self.assertEqual(views[1].get_index('simp'),
+                         {'国': [0], '人': [1], '国人': [2], '好': [3]})
+        sample_out = StringIO()
+        views[1].save_file(sample_out, {'attr_order': ['simp']})
+        self.assertEqual(sample_out.getvalue(), '//B\n国\n//C\n人\n国人\n好')
+        # changes materialize the view, the source lists are not changed
+        views[1].words[2].simp = '国人们'
+        self.assertEqual(list2.words[0].simp, '国人')
+        self.assertIsNot(views[1].word(0), list1.words[1])
+        self.assertEqual(views[1].word(2).number, 2)
+        self.assertEqual([w.simp for w
+                          in views[1].mix_with(list2, 'simp')[1].words],
+                         ['好'])
+
+    def test_combine(self):
+        lists = [pyjiong.ChList(name, sections=[[name]], words=[
+            pyjiong.ChWord({'simp': simp, 'section': 0, 'number': no})
+            for no, simp in enumerate(words)]) for name, words in [
+                ('a', ['中国', '人', '好', '猫']),
+                ('b', ['人', '好', '狗']),
+                ('c', ['好', '狗', '鱼'])]]
+
+        def combine(*args, **kwargs):
+            return [word.simp for word in pyjiong.ChList.combine(
+                lists, 'simp', *args, **kwargs).words]
+
+        self.assertEqual(combine(), ['中国', '人', '好', '猫', '狗', '鱼'])
+        self.assertEqual(combine(operation='intersection'), ['好'])
+        self.assertEqual(combine(operation='difference'), ['中国', '猫'])
+        self.assertEqual(combine(operation='exactly', k=2), ['人', '狗'])
+        self.assertEqual(combine(operation='union', primary=2),
+                         ['好', '狗', '鱼', '中国', '人', '猫'])
+        # the sections of the primary list come first
+        for views in (False, True):
+            result = pyjiong.ChList.combine(lists, 'simp', primary=1,
+                                            views=views)
+            self.assertEqual(result.sections, [['b'], ['a'], ['c']])
+            words = result.materialize().words if views else result.words
+            self.assertEqual([(word.simp, word.section) for word in words],
+                             [('人', 0), ('好', 0), ('狗', 0), ('中国', 1),
+                              ('猫', 1), ('鱼', 2)])
+        self.assertRaises(ValueError, combine, operation='xor')
+        # characters, 国人 has all of them in list a and goes after 人
+        lists[1].append(pyjiong.ChWord({'simp': '国人', 'section': 0}))
+        self.assertEqual(combine(True, 'exactly', 2), ['人', '国人', '狗'])
+        result = pyjiong.ChList.combine(lists, 'simp', True, 'exactly', 2)
+        self.assertEqual(result.name, 'a_exactly_2_b_c')
+        self.assertEqual(result.sections, [['a'], ['b']])
+        self.assertEqual([w.section for w in result.words], [0, 0, 1])
+        self.assertEqual([(word.simp, section) for word, section
+                          in pyjiong.ChList.iter_combine(
+                              lists, 'simp', operation='exactly', k=2)],
+                         [('人', ['a']), ('狗', ['b'])])
+        self.assertIs(next(pyjiong.ChList.iter_combine(lists, 'simp'))[0],
+                      lists[0].words[0])
+
+    def test_iter_text_list(self):
+        sample_in = ('//Book 1/Chapter 1\n//Book 1/Chapter 2\n'
+                     '中国[中國]\tzhong1guo2\tChina\n# comment\n\n'
+                     '[們]\tmen5\n好\thao3\tgood\n//Book 2\n'
+                     '人\tren2\tperson\n//Book 3\n')
+        expected_events = [
+            (['Book 1', 'Chapter 2'], None),
+            (None, {'simp': '中国', 'trad': '中國', 'pinyin': 'zhong1guo2',
+                    'definition': 'China', 'section': 0, 'number': 0}),
+            (None, {'trad': '們', 'pinyin': 'men5', 'section': 0,
+                    'number': 1}),
+            (None, {'simp': '好', 'pinyin': 'hao3', 'definition': 'good',
+                    'section': 0, 'number': 2}),
+            (['Book 2'], None),
+            (None, {'simp': '人', 'pinyin': 'ren2', 'definition': 'person',
+                    'section': 1, 'number': 3}),
+            (['Book 3'], None)]
+        # tiny chunks, entries and delimiters span several chunks
+        for chunk_size in (1, 3, 1 << 16):
+            self.assertEqual(list(pyjiong.iter_text_list(
+                StringIO(sample_in), chunk_size=chunk_size)), expected_events)
+        sections, words = pyjiong.open_text_list(StringIO(sample_in))
+        self.assertEqual(len(sections), 3)
+        sample_out = StringIO()
+        pyjiong.save_text_list(sample_out, sections, iter(words),
+                               batch_size=2)
+        # empty sections and attributes are not kept
+        self.assertEqual(sample_out.getvalue(), (
+            '//Book 1/Chapter 2\n中国[中國]\tzhong1guo2\tChina\n'
+            '[們]\tmen5\t\n好[]\thao3\tgood\n//Book 2\n人[]\tren2\tperson'))
+
     def test_convert_pinyin(self):
         test_list = [
                 ('ni3', 'nǐ'),
@@ -60,6 +547,22 @@ class PyjiongTest(unittest.TestCase):
             self.assertEqual(pyjiong.pinyin_normalize(test[0]),
                              pyjiong.pinyin_mark_to_num(test[1]))
     
+    def test_convert_pinyin_text(self):
+        self.assertEqual(pyjiong.pinyin_convert('Zhong1guo2 LV4 nu:e4 r5'),
+                         'Zhōngguó LǛ nüè r5')
+        self.assertEqual(pyjiong.pinyin_convert('Zhōng guó, ma nüè', 'num'),
+                         'Zhong1 guo2, ma nüe4')
+        self.assertEqual(pyjiong.pinyin_convert("Zhōngguórén xī'ān hello",
+                                                'num'),
+                         "Zhong1guo2ren2 xi1'an1 hello")
+        self.assertEqual(list(pyjiong.pinyin_convert_many(['Běijīngde'],
+                                                          'num')),
+                         ['Bei3jing1de'])
+        self.assertEqual(list(pyjiong.pinyin_convert_many(
+                             StringIO('ni3 hao3\nxie4xie5\n'))),
+                         ['nǐ hǎo\n', 'xièxie\n'])
+        self.assertRaises(ValueError, pyjiong.pinyin_convert, 'ni3', 'x')
+    
     def test_split_pinyin(self):
         test_list1 = [
                 ('yi1', 'i'),
@@ -91,7 +594,9 @@ class PyjiongTest(unittest.TestCase):
                 ('Hm2', ('hm', '', 2)),
                 ('shuang1', ('sh', 'uang', 1)),
                 ('you2', ('', 'iu', 2)),
-                ('yo', ('', 'io', 5))
+                ('yo', ('', 'io', 5)),
+                ('jiu3', ('j', 'iu', 3)),
+                ('xuan2', ('x', 'üan', 2))
                 ]
         for test in test_list1:
             self.assertEqual(pyjiong.pinyin_split(test[0])[1], test[1])
@@ -99,6 +604,20 @@ class PyjiongTest(unittest.TestCase):
             self.assertEqual(pyjiong.pinyin_split(test[0]), test[1])
 
 
+    def test_tokenize_pinyin(self):
+        self.assertEqual(pyjiong.pinyin_segment("Zhōngguórén xī'ān nǎr"),
+                         ['Zhōng', 'guó', 'rén', 'xī', 'ān', 'nǎ', 'r'])
+        self.assertEqual(pyjiong.pinyin_segment('xiangong hello lv4'),
+                         ['xian', 'gong', 'hello', 'lü4'])
+        # without an apostrophe, no syllable inside a word starts with a vowel
+        self.assertEqual(pyjiong.pinyin_segment('fangan dangan'),
+                         ['fan', 'gan', 'dan', 'gan'])
+        self.assertEqual(pyjiong.pinyin_segment("fang'an"), ['fang', 'an'])
+        self.assertEqual(pyjiong.pinyin_tokenize("Shuang1 hello ān"),
+                         [('sh', 'uang', 1), ('', 'an', 1)])
+        self.assertEqual(list(pyjiong.pinyin_tokenize_many(['ér', 'Que4'])),
+                         [[('', 'er', 2)], [('q', 'üe', 4)]])
+
     def test_similar_pinyin(self):
         test_list = [
                 ('feng1', 'fen'),
@@ -108,6 +627,147 @@ class PyjiongTest(unittest.TestCase):
         for test in test_list:
             self.assertTrue(pyjiong.pinyin_are_similar(test[0], test[1]))
 
+    def test_pinyin_similarity(self):
+        similarity = pyjiong.PinyinSimilarity([1, 1, 0])
+        self.assertTrue(similarity.are_similar('ding3', 'ting3'))
+        self.assertFalse(similarity.are_similar('ding3', 'ting2'))
+        self.assertFalse(similarity.are_similar('ding3', 'lin3'))
+        for other in ('dian3', 'tian3', 'ting3'):
+            self.assertTrue(similarity.are_similar('ding3', other))
+        for other in ('ding2', 'jing3', 'deng3', 'ting4'):
+            self.assertFalse(similarity.are_similar('ding3', other))
+        # din and tin aren't valid syllables
+        self.assertEqual(similarity.similar_syllables('ding3'),
+                         {'ding3', 'dian3', 'tian3', 'ting3'})
+        self.assertEqual(
+            pyjiong.PinyinSimilarity([1, 0, 3]).similar_syllables('ding3'),
+            set(s + str(tone) for s in ('ding', 'ting') for tone in range(1, 6)))
+
+    def test_find_confusables(self):
+        words = [pyjiong.ChWord({'pinyin': pinyin}) for pinyin in
+                 ['ding3', 'ting1', 'lin2', 'bang3 shou3', 'pan2zhōu', '']]
+        test_list = pyjiong.ChList('test-list', words=words)
+        self.assertEqual(sorted(test_list.find_confusables()),
+                         [(0, 1), (3, 4)])
+        self.assertEqual(list(test_list.find_confusables([1, 1, 0])), [])
+
+    def test_pinyin_encode(self):
+        code = pyjiong.pinyin_encode('Zhōng')
+        self.assertEqual(code, pyjiong.pinyin_encode('zhong1'))
+        self.assertEqual(pyjiong.pinyin_decode(code), ('zh', 'ong', 1))
+        self.assertEqual(pyjiong.pinyin_encode('nu:e4'),
+                         pyjiong.pinyin_encode('nüè'))
+        self.assertEqual(list(pyjiong.pinyin_encode_many(['xx5', 'ma'])),
+                         [0, pyjiong.pinyin_encode('ma5')])
+        finals = set('a o e ai ei ao ou an en ang eng ong er i ia ie iao iu '
+                     'ian in iang ing iong io u ua uo uai ui uan un uang ueng '
+                     'ü üe üan ün'.split() + [''])
+        self.assertEqual(set(pyjiong.PINYIN_FINALS) - finals, set())
+        final_code = lambda syllable: (pyjiong.pinyin_encode(syllable) &
+                                       pyjiong.PINYIN_FINAL_MASK)
+        self.assertEqual(final_code('jiu3'), final_code('liu3'))
+        self.assertEqual(final_code('ju3'), final_code('lü3'))
+
+    def test_pinyin_index(self):
+        with open('./textfiles/cedict_ts_test.u8',
+                  mode='r',
+                  encoding='utf-8') as cedict_file:
+            index = pyjiong.PinyinIndex(pyjiong.open_cedict(cedict_file))
+        self.assertEqual([e[1] for k, e in index.find('Mǎ')], ['Ma3', 'ma3'])
+        self.assertEqual([e[1] for k, e in index.find('liang', False)],
+                         ['liang2', 'liang4'])
+        self.assertEqual(index.find('liang'), [])
+        similar = index.find_similar('can4', pyjiong.PinyinSimilarity([1, 1, 0]))
+        self.assertEqual([e[1] for k, e in similar], ['zan4'])
+        index = pyjiong.PinyinIndex({
+            '九': [('九', 'jiu3', ('nine',), {})],
+            '柳': [('柳', 'Liu3', ('surname Liu',), {})],
+            '丟': [('丢', 'diu1', ('to lose',), {})],
+            '舉': [('举', 'ju3', ('to lift',), {})]})
+        similar = index.find_similar('liu3', pyjiong.PinyinSimilarity([3, 0, 3]))
+        self.assertEqual(sorted(k for k, e in similar), ['丟', '九', '柳'])
+        self.assertEqual(index.find('hello'), [])
+        self.assertEqual(index.find('Q'), [])
+        self.assertEqual(index.find_similar('Q'), [])
+        # entries with invalid syllables aren't indexed
+        index = pyjiong.PinyinIndex({'X': [('X', 'xx5', ('X',), {})],
+                                     '馬': [('马', 'ma3', ('horse',), {})]})
+        self.assertEqual(index.entries, [('馬', ('马', 'ma3', ('horse',), {}))])
+        self.assertEqual(index.find('xx'), [])
+
+    def test_segmenter(self):
+        words = ['我', '是', '中國', '中國人', '國人', '研究', '研究生', '生命',
+                 '起源', '的']
+        segmenter = pyjiong.Segmenter(words)
+        self.assertEqual(segmenter.segment('我是中國人!abc'),
+                         ['我', '是', '中國人', '!abc'])
+        frequencies = {'研究': 100, '生命': 100, '研究生': 5}
+        segmenter = pyjiong.Segmenter(words, frequencies)
+        self.assertEqual(segmenter.segment('研究生命的起源囧'),
+                         ['研究', '生命', '的', '起源', '囧'])
+        self.assertEqual(list(segmenter.segment_many(['研究生命', ''])),
+                         [['研究', '生命'], []])
+
+    def test_simp_trad_converter(self):
+        pairs = [('頭髮', '头发'), ('發現', '发现'), ('發', '发'), ('髮', '发'),
+                 ('頭', '头'), ('發', '发')]
+        converter = pyjiong.SimpTradConverter(pairs)
+        self.assertEqual(converter.convert('头发,发现x'), '頭髮,發現x')
+        self.assertEqual(pyjiong.SimpTradConverter(pairs, 'simp').convert(
+            '頭髮發現'), '头发发现')
+        out_file = StringIO()
+        converter.convert_file(StringIO('头发' * 10 + '\n发现'), out_file, 3)
+        self.assertEqual(out_file.getvalue(), '頭髮' * 10 + '\n發現')
+        words = [pyjiong.ChWord({'simp': '头发'}),
+                 pyjiong.ChWord({'simp': '发', 'trad': '髮'})]
+        test_list = pyjiong.ChList('test-list', words=words)
+        converter.convert_chlist(test_list)
+        self.assertEqual([w.trad for w in test_list.words], ['頭髮', '髮'])
+        with open('./textfiles/cedict_ts_test.u8',
+                  mode='r',
+                  encoding='utf-8') as cedict_file:
+            converter = pyjiong.SimpTradConverter.from_cedict(
+                pyjiong.open_cedict(cedict_file, 'simp'), 'trad', 'simp')
+        self.assertEqual(converter.convert('马暂量'), '馬暫量')
+
+    def test_pinyin_annotator(self):
+        cedict = {'中国人': [('中國人', 'Zhong1 guo2 ren2', (), {})],
+                  '西安': [('西安', 'Xi1 an1', (), {})],
+                  '女': [('女', 'nu:3', (), {})],
+                  '兙': [('兙', 'shi2 ke4', (), {})]}
+        unihan = {'很': {'kMandarin': ['hěn']}}
+        annotator = pyjiong.PinyinAnnotator(cedict, unihan)
+        text = '中国人很女, 西安囧!'
+        self.assertEqual(annotator.annotate(text, 'num'),
+                         'Zhong1guo2ren2 hen3 nü3, Xi1an1 囧!')
+        self.assertEqual(annotator.annotate(text),
+                         "Zhōngguórén hěn nǚ, Xī'ān 囧!")
+        self.assertEqual(annotator.annotate('很<b>囧', 'html'),
+                         '<ruby>很<rt>hěn</rt></ruby>&lt;b&gt;囧')
+        # more syllables than characters
+        self.assertEqual(annotator.annotate('兙', 'num'), 'shi2ke4')
+        self.assertEqual(annotator.annotate('兙'), 'shíkè')
+        self.assertEqual(annotator.annotate('兙', 'html'),
+                         '<ruby>兙<rt>shíkè</rt></ruby>')
+        hits = annotator.word_to_pinyin.cache_info().hits
+        self.assertEqual(list(annotator.annotate_many(['很', '很'])),
+                         ['hěn', 'hěn'])
+        self.assertEqual(annotator.word_to_pinyin.cache_info().hits, hits + 2)
+        # open_unihan_dir, kMandarin before kHanyuPinyin
+        unihan = pyjiong.UnihanColumns({
+            'kMandarin': {ord('很'): ['hěn']},
+            'kHanyuPinyin': {ord('很'): ['hén'], ord('囧'): ['jiǒng']}})
+        annotator = pyjiong.PinyinAnnotator(cedict, unihan)
+        self.assertEqual(annotator.annotate('很囧', 'num'), 'hen3 jiong3')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            in_path = os.path.join(temp_dir, 'in.txt')
+            out_path = os.path.join(temp_dir, 'out.txt')
+            with open(in_path, mode='w', encoding='utf-8') as in_file:
+                in_file.write('很囧\n')
+            annotator.annotate_files([(in_path, out_path)], processes=1)
+            with open(out_path, mode='r', encoding='utf-8') as out_file:
+                self.assertEqual(out_file.read(), 'hěn jiǒng\n')
+
     def test_only_hanzi(self):
         hanzi_mix = '1234567890ß!"§$%&/()=? \
                 ¹²³¼½½¬¬{{[[]}\ééäöüasdfjkl \
@@ -115,6 +775,17 @@ class PyjiongTest(unittest.TestCase):
         only_hanzi = '漢字'
         self.assertEqual(only_hanzi,pyjiong.only_hanzi(hanzi_mix))
 
+    def test_only_hanzi_bulk(self):
+        lines = StringIO('a漢b字\nabc\n𠀀 𪜀 鿿\n')
+        self.assertEqual(list(pyjiong.only_hanzi_many(['a漢', '', '字b'])),
+                         ['漢', '', '字'])
+        self.assertEqual(list(pyjiong.only_hanzi_stream(lines)),
+                         ['漢字', '', '𠀀𪜀鿿'])
+        lines.seek(0)
+        self.assertEqual(list(pyjiong.only_hanzi_stream(lines, True)),
+                         ['漢字', '𠀀𪜀鿿'])
+        self.assertEqual(pyjiong.hanzi_spans('ab漢字c中'), [(2, 4), (5, 6)])
+
 if __name__ == '__main__':
     unittest.main()
 